@@ -23,227 +23,219 @@
         time_fraction: fraction of the daylight hours that shading blinds are in use
         window_height: The height of the window frame
         month_Solar_declination: 
+        cache_size: Number of mass results kept between solves, so only the masses that changed and their neighbours are recomputed. Default 4096, set to 0 to disable the cache
+        show_preview: Set to False to skip the preview meshes. The meshes are cached per mass and only recoloured when the risk of the mass changes. Default True
+        breakdown_file: Path of an .npz file to save the breakdown of the heat balance to: one row per wall, window, roof and ventilation term of every mass (room, element, orientation, area, flux, z, gain, loss), see overheating.breakdown
+        profile_solve: Set to True to time the stages of the solve and output the report to profile
     Outputs:
         results: Likelihood of high internal temperature during hot weather.
         preview: Colored mesh preview
+        model: JSON of the exposed walls and masses, to run parametric sweeps outside Grasshopper with overheating.sweep.from_json
+        profile: Wall time and calls of every stage of the solve and the stages of the slowest masses (when profile_solve is True)
 """
 #Copyright (c) 2021, Hamidreza Shahriari 
 __author__ = "Hamidreza"
 
 
 
-import rhinoscriptsyntax as rs
 import Rhino.Geometry as rg
 import ghpythonlib.components as ghc
 import math
+import json
 import Grasshopper.Kernel.GH_Convert as ghconvert
-from scriptcontext import doc
+from scriptcontext import doc, sticky
+from overheating import sap, tables, cache, breakdown, profiling
 
 if not max_roof_angle:
     max_roof_angle = 1
+if not North:
+    North = rg.Vector3d.YAxis
+# inputs added after the shipped definition are read only when the component has them
+cache_size, show_preview, breakdown_file, profile_solve = [globals().get(name)
+    for name in ('cache_size', 'show_preview', 'breakdown_file', 'profile_solve')]
+profiler = profiling.Profiler(bool(profile_solve))
 
-def air_change_rate(op_type,bld_type):
-    # calculating air change rate according to the guide lines in SAP 2012 Appendix P
-    if (op_type == 0) and (bld_type == 0):
-        return float(0.1)
-    elif (op_type == 0) and (bld_type == 1):
-        return float(0.1)
-    elif (op_type == 0) and (bld_type == 2):
-        return float(0.2)
-    elif (op_type == 0) and (bld_type == 3):
-        return float(0.1)
-    elif (op_type == 1) and (bld_type == 0):
-        return float(0.8)
-    elif (op_type == 1) and (bld_type == 1):
-        return float(0.5)
-    elif (op_type == 1) and (bld_type == 2):
-        return float(1)
-    elif (op_type == 1) and (bld_type == 3):
-        return float(0.6)
-    elif (op_type == 2) and (bld_type == 0):
-        return float(3)
-    elif (op_type == 2) and (bld_type == 1):
-        return float(2)
-    elif (op_type == 2) and (bld_type == 2):
-        return float(4)
-    elif (op_type == 2) and (bld_type == 3):
-        return float(2.5)
-    elif (op_type == 3) and (bld_type == 0):
-        return float(6)
-    elif (op_type == 3) and (bld_type == 1):
-        return float(4)
-    elif (op_type == 3) and (bld_type == 2):
-        return float(8)
-    elif (op_type == 3) and (bld_type == 3):
-        return float(5)
-    else:
-        print("Please enter the building type and opening type according to the guide line")
-        
-def guid_to_brep(breps):
-    # this definition converts the brep list to GUID in order to be used for union process
-    list = []
-    for brep in breps:
-        list.append(doc.Objects.AddBrep(brep))
-    return list
-
-
-def solar_flux_calculator(surface, s_flux, latitude, North, max_roof_angle, month_Solar_declination):
-    if not North:
-        North = rg.Vector3d.YAxis
-    else:
-        North = North
-    k_values = { 'North' : [26.3,-38.5,14.8,-16.5,27.3 ,-11.9,-1.06, 0.0872, -0.191],
-    'South' : [-0.66,-0.106,2.93,3.63,-0.374,-7.4,-2.71,-0.991,4.59],
-    'SE' : [-2.95,2.89,1.17,5.67,-3.54,-4.28,-2.72,-0.25,3.07],
-    'East' : [1.44,-2.36,1.07,-0.514,1.89,-1.64,-0.542,-0.757,0.604],
-    'NE' : [0.165,-3.68,3.0 ,6.38 ,-4.53 ,-0.405 ,-4.38 ,4.89 ,-1.99]}
-            
+def face_orientation(surface, North):
+    # calculating the SAP orientation key and the inclination of the surface
     surface_vector = surface.NormalAt(0.5,0.5)
-    delta = math.radians(latitude - month_Solar_declination)
-    # calculating surface inclination
     srf_incl = rg.Vector3d.VectorAngle(surface_vector, rg.Vector3d.ZAxis) * 180 / math.pi
-            
-    # calculating conveting factor
-    if srf_incl <= max_roof_angle:
-        Rh = 1
-        key = 0
-    else:
-        # calculating the orientation
-        vector_angle = rg.Vector3d.VectorAngle(surface_vector, North) * 180 / math.pi
-        if vector_angle < 36:
-            key = 'North'
-        if vector_angle >= 36 and vector_angle < 72:
-            key = 'NE'
-        if vector_angle >= 72 and vector_angle < 108:
-            key = 'East'
-        if vector_angle >= 108 and vector_angle < 144:
-            key = 'SE'
-        if vector_angle >= 144 and vector_angle <= 180:
-            key = 'South'
-    A = k_values[key][0] * (math.sin(math.radians(srf_incl/2)) ** 3) + k_values[key][1] * ((math.radians(srf_incl/2)) ** 2) + k_values[key][2] * (math.radians(srf_incl/2))
-    B = k_values[key][3] * (math.sin(math.radians(srf_incl/2)) ** 3) + k_values[key][4] * ((math.radians(srf_incl/2)) ** 2) + k_values[key][5] * (math.radians(srf_incl/2))
-    C = k_values[key][6] * (math.sin(math.radians(srf_incl/2)) ** 3) + k_values[key][7] * ((math.radians(srf_incl/2)) ** 2) + k_values[key][8] * (math.radians(srf_incl/2)) + 1
-    Rh = (A * (math.cos(delta)**2)) + (B * (math.cos(delta))) + C
-    return (s_flux * Rh, key, srf_incl)
-
-
-def z_summer(surface, window_height, z_blinds, solar_acces, overhang, time_fraction, orientation, srf_incl, WWR, max_roof_angle):
-    if srf_incl < max_roof_angle:
-        return 1
-    if solar_acces > 80:
-         solar_acces_factor = 0.5
-    elif solar_acces > 60 and solar_acces <= 80:
-        solar_acces_factor = 0.7
-    elif solar_acces > 20 and solar_acces <= 60:
-        solar_acces_factor = 0.9
-    elif solar_acces <= 20:
-        solar_acces_factor = 1
-    if not overhang and not z_blinds and not time_fraction:
-        return solar_acces_factor
-    if not window_height:
-        window_height = math.sqrt(surface.GetSurfaceSize()[2])
-    # defining a dictionary for Shading factors for blinds, curtains or external shutters according to SAP table P3
-    blind_dic = { '0' : 0.8 , '1' : 0.9, '2' : 0.85, '3' : 0.6, '4' : 0.88 , '5' : 0.7, '6' : 0.27, '7' : 0.24, '8' : 0.85, '9' : 0.65}
-    # Defining the shading factor of the blinds according to the fraction of the daylight hours
-    if time_fraction and z_blinds:
-        blind_factor = time_fraction * blind_dic ['{}'.format(z_blinds)] + (1 - time_fraction)
-    elif not time_fraction and z_blinds:
-        blind_factor = blind_dic ['{}'.format(z_blinds)]
-    elif not z_blinds:
-        blind_factor = 1
-    # finding the depth factor of the overhang window 
-    d_factor = overhang / window_height
-    if d_factor < 0.1:
-        depth_factor = 'zr'
-    elif d_factor >= 0.1 and d_factor < 0.3:
-        depth_factor = 'two'
-    elif d_factor >= 0.3 and d_factor < 0.5:
-        depth_factor = 'four'
-    elif d_factor >= 0.5 and d_factor < 0.7:
-        depth_factor = 'six'
-    elif d_factor >= 0.7 and d_factor < 0.9:
-        depth_factor = 'eight'
-    elif d_factor >= 0.9 and d_factor < 1.1:
-        depth_factor = 'ten'
-    else:
-        depth_factor = 'twlv'
-    window_width = surface.GetSurfaceSize()[1]
-    if overhang/window_width < 2:
-        overhang_dic = {'Northzr': 1, 'NEzr': 1, 'Eastzr': 1, 'SEzr': 1, 'Southzr': 1, 
-        'Northtwo': 0.94, 'NEtwo': 0.91, 'Easttwo': 0.89, 'SEtwo': 0.84, 'Southtwo': 0.79,
-        'Northfour': 0.9, 'NEfour': 0.85, 'Eastfour': 0.79, 'SEfour': 0.72, 'Southfour': 0.64,
-        'Northsix': 0.88, 'NEsix': 0.81, 'Eastsix': 0.72, 'SEsix': 0.62, 'Southsix': 0.53,
-        'Northeight': 0.86, 'NEeight': 0.79, 'Easteight': 0.66, 'SEeight': 0.55, 'Southeight': 0.5,
-        'Northten': 0.85, 'NEten': 0.77, 'Eastten': 0.61, 'SEten': 0.52, 'Southten': 0.49,
-        'Northtwlv': 0.84, 'NEtwlv': 0.76, 'Easttwlv': 0.57, 'SEtwlv': 0.5, 'Southtwlv': 0.48}
-    else:
-        overhang_dic = {'Northzr': 1, 'NEzr': 1, 'Eastzr': 1, 'SEzr': 1, 'Southzr': 1, 
-        'Northtwo': 0.92, 'NEtwo': 0.89, 'Easttwo': 0.88, 'SEtwo': 0.83, 'Southtwo': 0.79,
-        'Northfour': 0.85, 'NEfour': 0.8, 'Eastfour': 0.76, 'SEfour': 0.67, 'Southfour': 0.55,
-        'Northsix': 0.79, 'NEsix': 0.72, 'Eastsix': 0.66, 'SEsix': 0.54, 'Southsix': 0.38,
-        'Northeight': 0.73, 'NEeight': 0.65, 'Easteight': 0.58, 'SEeight': 0.43, 'Southeight': 0.32,
-        'Northten': 0.69, 'NEten': 0.59, 'Eastten': 0.51, 'SEten': 0.36, 'Southten': 0.3,
-        'Northtwlv': 0.66, 'NEtwlv': 0.55, 'Easttwlv': 0.46, 'SEtwlv': 0.31, 'Southtwlv': 0.29}
-    return float(blind_factor * (solar_acces_factor+ overhang_dic[orientation + depth_factor] - 1))
-
-def temprature_threshold(TMP, Summer_ratio, ex_t_average):
-    # Obtaining the threshold internal temperature which is used to estimate likelihood of high internal temperature.
-    if TMP < 285:
-        delta_t_mass = 2.0 - 0.007 * TMP
-    else:
-        delta_t_mass = 0
-    temp_thresh = ex_t_average + Summer_ratio + delta_t_mass
-    if temp_thresh < 20.5:
-        overheating = 'Not significant'
-        color = "3,166,90"
-    elif temp_thresh >= 20.5 and temp_thresh < 22:
-        overheating = 'Slight'
-        color = "242,191,39"
-    elif temp_thresh >= 22 and temp_thresh < 23.5:
-        overheating = 'Medium'
-        color = "217,121,4"
-    else:
-        overheating = 'High'
-        color = "191,4,4"
-    return overheating, color
-
-
-# making the union of the breps to exclude the inner partions of the faces
-b1 = rs.BooleanUnion(guid_to_brep(masses))
-
-# convering the new unioned brep GUID into brep class
-brep_union = rs.coercebrep(b1)
+    vector_angle = rg.Vector3d.VectorAngle(surface_vector, North) * 180 / math.pi
+    return sap.orientation_key(vector_angle), srf_incl
 
-results = []
-preview = []
 
-for i, brep in enumerate(masses):
+def face_outline(face, tolerance):
+    # outward plane and outer boundary of a planar face (None for curved faces, which can not be party walls)
+    is_planar, plane = face.TryGetPlane(tolerance)
+    if not is_planar:
+        return None
+    if face.OrientationIsReversed:
+        plane.Flip()
+    box = face.GetBoundingBox(False)
+    box.Inflate(tolerance)
+    return plane, face.OuterLoop.To3dCurve(), box
+
+
+def overlap_area(outline_a, outline_b, tolerance):
+    # area shared by two planar faces of neighbouring masses that lie on the same plane and face each other
+    plane_a, curve_a, box_a = outline_a
+    plane_b, curve_b, box_b = outline_b
+    if plane_a.Normal.IsParallelTo(plane_b.Normal) != -1 or abs(plane_a.DistanceTo(plane_b.Origin)) > tolerance:
+        return 0
+    if not rg.BoundingBox.Intersection(box_a, box_b).IsValid:
+        return 0
+    overlaps = rg.Curve.CreateBooleanIntersection(curve_a, curve_b, tolerance) or []
+    return sum(rg.AreaMassProperties.Compute(curve).Area for curve in overlaps)
+
+
+def mass_neighbours(masses, tolerance):
+    # finding the masses touching each mass with an RTree of the mass bounding boxes
+    tree = rg.RTree()
+    boxes = []
+    for i, brep in enumerate(masses):
+        box = brep.GetBoundingBox(False)
+        box.Inflate(tolerance)
+        boxes.append(box)
+        tree.Insert(box, i)
+    neighbours = []
+    for i in range(len(masses)):
+        found = []
+        tree.Search(boxes[i], lambda sender, e: found.append(e.Id))
+        neighbours.append(sorted(j for j in found if j != i))
+    return neighbours
+
+
+def exposed_faces(brep, neighbour_outlines, tolerance):
+    # finding the exposed area of every face of the mass without a boolean union. Coplanar faces of
+    # neighbouring masses that face each other are party walls (or floors) and their shared area is not exposed.
+    exposed = []
+    for face in brep.Faces:
+        with profiler.stage('face area'):
+            area = rg.AreaMassProperties.Compute(face).Area
+        with profiler.stage('face outline'):
+            outline_a = face_outline(face, tolerance)
+        if outline_a is not None:
+            with profiler.stage('party wall overlap'):
+                for outline_b in neighbour_outlines:
+                    if outline_b is not None:
+                        area -= overlap_area(outline_a, outline_b, tolerance)
+        exposed.append((face, area))
+    return exposed
+
+
+def geometry_hash(brep):
+    # fingerprint of the mass geometry, which changes whenever a vertex moves
+    return hash(cache.fingerprint([(v.Location.X, v.Location.Y, v.Location.Z) for v in brep.Vertices]) + (brep.Faces.Count,))
+
+
+def assess_mass(brep, neighbour_outlines, tolerance):
     loss  = 0
     gain = 0
-    for face in brep_union.Faces:
-        # Calculating the Trimed faces center points in order to find which zone the new face belongs to 
-        center_point = rg.AreaMassProperties.Compute(face).Centroid
-        # Calculating the heat gain and heat loss of each external surface
-        if ghc.PointInBrep(brep, center_point, False) and ((rg.Vector3d.VectorAngle(face.NormalAt(0.5,0.5), rg.Vector3d.ZAxis) * 180 / math.pi) < 170) and ((rg.Vector3d.VectorAngle(face.NormalAt(0.5,0.5), rg.Vector3d.ZAxis) * 180 / math.pi) > max_roof_angle):
-            s_flux, key, srf_incl = solar_flux_calculator(face, solar_flux, Latitude, North, max_roof_angle, month_Solar_declination)
-            wall_area = rg.AreaMassProperties.Compute(face).Area
-            shade_factor = z_summer(face, window_height, curt_blind, solar_access, overhangs, time_fraction, key, srf_incl, WWR, max_roof_angle)
-            s_gain = 0.9 * wall_area * WWR * FF * s_flux * shade_factor * g_value
-            gain += s_gain
-            heat_loss = (wall_area * (1-WWR) * U_wall) + (wall_area * WWR * U_window) + 0.15 * wall_area
-            loss += heat_loss
-        elif ghc.PointInBrep(brep, center_point, False) and ((rg.Vector3d.VectorAngle(face.NormalAt(0.5,0.5), rg.Vector3d.ZAxis) * 180 / math.pi) <= max_roof_angle) and Roof:
-            loss += (rg.AreaMassProperties.Compute(face).Area) * (U_roof+0.15)
-        else:
+    walls = []
+    rows = []
+    roof_area = 0
+    for face, wall_area in exposed_faces(brep, neighbour_outlines, tolerance):
+        # faces (nearly) covered by neighbours are party walls; tolerance is a length, so compare with its square
+        if wall_area <= tolerance ** 2:
             continue
+        with profiler.stage('orientation'):
+            key, srf_incl = face_orientation(face, North)
+        # Calculating the heat gain and heat loss of each external surface
+        if srf_incl < 170 and srf_incl > max_roof_angle:
+            with profiler.stage('gain and loss'):
+                s_flux = sap.solar_flux(solar_flux, key, srf_incl, Latitude, month_Solar_declination)
+                srf_size = face.GetSurfaceSize()
+                shade_factor = sap.z_summer(key, solar_access, curt_blind, time_fraction, overhangs, window_height or math.sqrt(srf_size[2]), srf_size[1])
+                win_gain = sap.opening_gain(wall_area * WWR, FF, s_flux, shade_factor, g_value)
+                win_loss = sap.fabric_loss(wall_area * WWR, U_window)
+                wall_loss = sap.fabric_loss(wall_area * (1-WWR), U_wall) + sap.bridging_loss(wall_area)
+                gain += win_gain
+                loss += wall_loss + win_loss
+                rows.append(breakdown.wall_row(key, wall_area * (1-WWR), wall_loss))
+                rows.append(breakdown.window_row(key, wall_area * WWR, s_flux, shade_factor, win_gain, win_loss))
+                walls.append((wall_area, key, srf_incl, window_height or math.sqrt(srf_size[2]), srf_size[1]))
+        elif srf_incl <= max_roof_angle and Roof:
+            roof_loss = sap.fabric_loss(wall_area, U_roof) + sap.bridging_loss(wall_area)
+            loss += roof_loss
+            rows.append(breakdown.roof_row(wall_area, roof_loss))
+            roof_area += wall_area
     # calculating the volume of the space
-    vol = rg.VolumeMassProperties.Compute(brep).Volume
-    # calculating ventilation heat loss:
-    n = air_change_rate(opn_type,bld_type)
-    vent_loss = 0.33 * n * vol
-    loss += vent_loss
-    ratio = gain / loss
-    results.append(temprature_threshold(TMP, ratio, ex_t_average)[0])
+    with profiler.stage('volume'):
+        vol = rg.VolumeMassProperties.Compute(brep).Volume
+    with profiler.stage('threshold'):
+        # calculating ventilation heat loss:
+        n = sap.air_change_rate(opn_type,bld_type)
+        vent_loss = sap.ventilation_loss(n, vol)
+        loss += vent_loss
+        rows.append(breakdown.ventilation_row(vent_loss))
+        ratio = sap.summer_ratio(gain, loss)
+        band = sap.risk_band(sap.threshold_temperature(TMP, ratio, ex_t_average))
+    return tables.RISK_LEVELS[band], band, walls, roof_area, vol, rows
+
+
+def mass_meshes(brep):
+    with profiler.stage('mesh'):
+        return rg.Mesh.CreateFromBrep(brep)
+
+
+def colour_meshes(meshes, color):
     # coloring the mesh according to the temprature threshold
-    for mesh in rg.Mesh.CreateFromBrep(brep):
-        preview.append(ghc.MeshColours(mesh,(temprature_threshold(TMP, ratio, ex_t_average)[1])))
\ No newline at end of file
+    with profiler.stage('mesh colour'):
+        return [ghc.MeshColours(mesh, "{},{},{}".format(*color)) for mesh in meshes]
+
+
+if cache_size is None:
+    cache_size = cache.DEFAULT_MAXSIZE
+results_cache = cache.sticky_cache(sticky, "overheating_SAP_{}".format(ghenv.Component.InstanceGuid), cache_size)
+preview_cache = cache.sticky_cache(sticky, "overheating_SAP_preview_{}".format(ghenv.Component.InstanceGuid), cache_size,
+    cache.PreviewCache)
+if show_preview is None:
+    show_preview = True
+tolerance = doc.ModelAbsoluteTolerance
+# every input other than the geometry is part of the cache key
+inputs_key = cache.fingerprint([North.X, North.Y, North.Z, Latitude, g_value, bld_type, solar_access, U_window, U_wall, WWR,
+    solar_flux, Roof, max_roof_angle, U_roof, overhangs, curt_blind, opn_type, TMP, FF, ex_t_average, time_fraction,
+    window_height, month_Solar_declination, tolerance])
+
+results = []
+preview = []
+heat_balance = breakdown.Breakdown() if breakdown_file else None
+wall_columns = dict((name, []) for name in ('room', 'area', 'orientation', 'inclination', 'window_height', 'window_width'))
+mass_columns = {'volume': [], 'roof_area': []}
+
+with profiler.stage('geometry hash'):
+    hashes = [geometry_hash(brep) for brep in masses]
+with profiler.stage('neighbours'):
+    neighbours = mass_neighbours(masses, tolerance)
+outlines = {}
+
+for i, brep in enumerate(masses):
+    with profiler.room(i):
+        # a mass is only recomputed when its own geometry, one of its neighbours or an input changed
+        key = (hashes[i], tuple(hashes[j] for j in neighbours[i]), inputs_key)
+        mass_result = results_cache.get(key)
+        if mass_result is None:
+            with profiler.stage('face outline'):
+                for j in neighbours[i]:
+                    if j not in outlines:
+                        outlines[j] = [face_outline(face, tolerance) for face in masses[j].Faces]
+            mass_result = assess_mass(brep, [outline for j in neighbours[i] for outline in outlines[j]], tolerance)
+            results_cache.put(key, mass_result)
+        if show_preview:
+            # the meshes only depend on the mass geometry and are recoloured when its risk changes
+            preview.extend(preview_cache.get(hashes[i], mass_result[1], lambda: mass_meshes(brep), colour_meshes))
+    results.append(mass_result[0])
+    for wall in mass_result[2]:
+        wall_columns['room'].append(i)
+        for name, value in zip(('area', 'orientation', 'inclination', 'window_height', 'window_width'), wall):
+            wall_columns[name].append(value)
+    mass_columns['volume'].append(mass_result[4])
+    mass_columns['roof_area'].append(mass_result[3])
+    if heat_balance is not None:
+        heat_balance.extend(i, mass_result[5])
+
+wall_columns['solar_access'] = solar_access or 0
+mass_columns['bld_type'] = bld_type
+model = json.dumps({'walls': wall_columns, 'masses': mass_columns})
+if heat_balance is not None:
+    heat_balance.save(breakdown_file)
+profile = profiler.report()
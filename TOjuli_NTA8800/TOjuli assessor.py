@@ -0,0 +1,56 @@
+"""Use this plugin to take any list of Honeybee rooms to calculate the NTA 8800 TOjuli indicator (temperature exceedance in July) of every room, together with the SAP 2012 Appendix P risk of overheating. Both methods are calculated from the same pass over the faces and apertures of the rooms.
+    Inputs:
+        north_: A vector to represent the North direction. If not provided the default Y axis will be selected as North
+        _hb_objs: A list of honeybee rooms to perform the study on
+        _bld_type: Building type according to the SAP Table p1. The values: {"single story dwelling" = 0, "Dwelling of two or more storeys" = 1}. Cross ventilation is found from the directions of the operable windows
+        _op_type: Ventilation Opening type according to the SAP Table p1. The values: {"Trickle vents only" = 0 , "Windows slightly open (50 mm)" = 1, "Windows open half the time" = 2,"Windows fully open" = 3}
+        _solar_acces_: Percentage of Sky blocked by obstecles. {"Heavy" > 80, "More than avarage" >60 & <80, "average or Unknown" >20 & <60, "very little" <20}
+        z_blinds_: Selcet the type of blinds, curtains or external shutters according to SAP table P3 (see the SAP overheating assessor)
+        time_fraction_: fraction of the daylight hours that shading blinds are in use
+        _TMP_: Thermal mass parameter (kJ/m2K), used for the time constant of TOjuli and the SAP threshold temperature. Defult set to 220
+        FF_: The frame factor for windows and doors, Defult "0.7" (fraction of opening that is glazed)
+        _latitude_: Latitude of the building. Defult De Bilt (52.1)
+        _solar_flux_: Mean solar flux on the horizontal surface in July (W/m2). Defult De Bilt
+        _ex_t_average_: Mean external temperature in July. Defult De Bilt
+        internal_gain_: Internal heat gain (W per m2 of floor area). Defult 2.2
+    Outputs:
+        tojuli: TOjuli (K) of every room
+        compliant: True when TOjuli of the room is within the limit of 1.2 K
+        sap_results: Likelihood of high internal temperature (SAP 2012 Appendix P) of every room in July, in the same climate
+        preview: Floors coloured green (TOjuli within the limit) or red
+"""
+#Copyright (c) 2021, Hamidreza Shahriari
+__author__ = "Hamidreza"
+import Rhino.Geometry as rg
+from ladybug_rhino.togeometry import to_vector2d
+import ladybug.color as lc
+from ladybug_rhino.fromgeometry import from_face3ds_to_colored_mesh
+from overheating import tables, rooms, tojuli as nta
+
+if north_:
+    north_ = to_vector2d(north_)
+else:
+    north_ = to_vector2d(rg.Vector3d(0,1,0))
+
+climate = {'latitude': _latitude_ if _latitude_ is not None else nta.LATITUDE,
+    'solar_flux': _solar_flux_ if _solar_flux_ is not None else nta.SOLAR_FLUX,
+    'ex_t_average': _ex_t_average_ if _ex_t_average_ is not None else nta.EX_T_AVERAGE}
+inputs = rooms.sap_inputs(north=north_, bld_type=_bld_type, op_type=_op_type, solar_access=_solar_acces_,
+    z_blinds=z_blinds_, time_fraction=time_fraction_, TMP=_TMP_, FF=FF_, month=nta.MONTH, **climate)
+if internal_gain_ is not None:
+    climate['internal_gain'] = internal_gain_
+
+constructions = rooms.ConstructionTable()
+tojuli = []
+compliant = []
+sap_results = []
+preview = []
+for obj in _hb_objs:
+    sap_rows, row, room_floors = rooms.assess_room_standards(obj, inputs, constructions=constructions, **climate)
+    tojuli.append(row['tojuli'])
+    compliant.append(row['compliant'])
+    sap_results.append(sap_rows[0]['risk'])
+    floors = [face.geometry for face in room_floors]
+    if floors:
+        color = tables.RISK_COLORS[0] if row['compliant'] else tables.RISK_COLORS[-1]
+        preview.append(from_face3ds_to_colored_mesh(floors, lc.Color(*color)))
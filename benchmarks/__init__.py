@@ -0,0 +1 @@
+"""Benchmarks of the overheating package, run with python -m benchmarks.run."""
@@ -0,0 +1,180 @@
+"""Benchmark of the SAP Appendix P engines on synthetic dwellings.
+
+    python -m benchmarks.run --rooms 1000 --faces 6 --apertures 2 --shades 1 -o bench_output.txt
+
+Each stage of the vectorized massing engine (face classification, flux, shading, ventilation, threshold) and of the
+Honeybee room assessment (room hash, overhangs, heat balance, threshold, preview) is timed on its own with the
+functions the components run, followed by an end to end run; the Honeybee assessment is also solved twice through
+the result cache of the component, cold (every room computed) and warm (every room found in the cache). The wall times, the
+throughput (rooms/s) and the peak memory of every engine are appended as one JSON line to the results file, so
+regressions and speedups can be tracked across versions.
+"""
+#Copyright (c) 2021, Hamidreza Shahriari
+__author__ = "Hamidreza"
+
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+from collections import OrderedDict
+
+import numpy as np
+
+from overheating import engine, profiling, sap, tables
+from benchmarks import synthetic
+
+MAX_ROOF_ANGLE = 45
+# Stages that run the whole assessment, left out of the sum of the stages
+WHOLE_RUNS = ('end to end', 'cold solve', 'warm solve')
+CLIMATE = {'solar_flux': 191, 'latitude': 51.5, 'month_Solar_declination': 21.2, 'ex_t_average': 16.9}
+
+
+def massing_engine(model, timer):
+    # The SAP_Standalone pipeline on arrays: classify the faces, then score every mass with overheating.engine
+    n_rooms = len(model['volume'])
+    with timer.stage('face classification'):
+        normal = model['normal']
+        srf_incl = np.degrees(np.arccos(np.clip(normal[:, 2], -1, 1)))
+        vector_angle = np.degrees(np.arccos(np.clip(normal[:, 1] / np.hypot(normal[:, 0], normal[:, 1]).clip(1e-12), -1, 1)))
+        wall = (srf_incl > MAX_ROOF_ANGLE) & (srf_incl < 170)
+        roof = srf_incl <= MAX_ROOF_ANGLE
+        openings = engine.opening_table(room=model['room'][wall], area=model['area'][wall] * 0.3,
+            orientation=engine.orientation_key(vector_angle[wall]), inclination=srf_incl[wall], g_value=0.63,
+            u_value=1.4, overhang=0.5, window_height=model['window_height'][wall],
+            window_width=model['window_width'][wall], blinds=3, time_fraction=0.5, solar_access=50)
+        wall_area = np.bincount(model['room'][wall], weights=model['area'][wall], minlength=n_rooms)
+        roof_area = np.bincount(model['room'][roof], weights=model['area'][roof], minlength=n_rooms)
+    with timer.stage('flux'):
+        s_flux = CLIMATE['solar_flux'] * engine.conversion_factor(openings['orientation'], openings['inclination'],
+            CLIMATE['latitude'], CLIMATE['month_Solar_declination'])
+    with timer.stage('shading'):
+        shade_factor = engine.opening_shading(openings)
+        gain = np.bincount(openings['room'], weights=tables.SOLAR_INCIDENCE * openings['area'] * openings['frame_factor']
+            * s_flux * shade_factor * openings['g_value'], minlength=n_rooms)
+    with timer.stage('ventilation'):
+        rooms = engine.room_table(volume=model['volume'], air_change_rate=engine.air_change_rate(2, 3),
+            fabric_loss=wall_area * 0.7 * 0.25 + (wall_area + roof_area) * tables.THERMAL_BRIDGING + roof_area * 0.15)
+        loss = engine.room_losses(openings, rooms)
+    with timer.stage('threshold'):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(loss > 0, gain / loss, 0.0)
+        engine.risk_band(engine.threshold_temperature(tables.DEFAULT_TMP, ratio, CLIMATE['ex_t_average']))
+    with timer.stage('end to end'):
+        engine.assess(openings, rooms, TMP=tables.DEFAULT_TMP, **CLIMATE)
+    return n_rooms
+
+
+def honeybee_engine(hb_rooms, timer):
+    # The functions of overheating.rooms that the Honeybee component runs, stage by stage over all the rooms,
+    # followed by overheating.rooms.assess_room end to end
+    from honeybee.boundarycondition import Outdoors
+    from honeybee.facetype import Wall
+    from overheating import cache, rooms
+    inputs = rooms.sap_inputs(latitude=CLIMATE['latitude'], solar_flux=CLIMATE['solar_flux'],
+        ex_t_average=CLIMATE['ex_t_average'], bld_type=1, op_type=2, z_blinds=3, time_fraction=0.5, solar_access=50)
+    month = inputs['month']
+    with timer.stage('room hash'):
+        constructions = rooms.ConstructionTable()
+        keys = [rooms.room_hash(room, constructions) for room in hb_rooms]
+    with timer.stage('overhangs'):
+        for room in hb_rooms:
+            for face in room.faces:
+                if isinstance(face.type, Wall) and isinstance(face.boundary_condition, Outdoors):
+                    rooms.aperture_overhangs(face.apertures)
+    with timer.stage('heat balance'):
+        # a new construction table, so the constructions are resolved again as in a solve without room hashes
+        constructions = rooms.ConstructionTable()
+        terms = [rooms.heat_balance_terms(room, inputs, constructions=constructions) for room in hb_rooms]
+    with timer.stage('threshold'):
+        bands = []
+        for coefficients, loss, floors in terms:
+            gain = inputs['solar_flux'] * sap.factor_from_coefficients(coefficients, inputs['latitude'],
+                tables.SOLAR_DECLINATION[month])
+            bands.append(sap.risk_band(sap.threshold_temperature(inputs['TMP'], sap.summer_ratio(gain, loss),
+                inputs['ex_t_average'])))
+    with timer.stage('preview'):
+        # the preview cache of the component, with ladybug-geometry meshes of the floors in place of Rhino meshes
+        previews = cache.PreviewCache()
+        for key, band, (coefficients, loss, floors) in zip(keys, bands, terms):
+            previews.get(key, band, lambda: [face.geometry.triangulated_mesh3d for face in floors],
+                lambda meshes, color: (meshes, color))
+    with timer.stage('end to end'):
+        constructions = rooms.ConstructionTable()
+        for room in hb_rooms:
+            rooms.assess_room(room, inputs, constructions)
+    # two solves of the Honeybee component: the cache is empty, then it holds every room
+    results_cache = cache.LRUCache(len(hb_rooms))
+    for stage in ('cold solve', 'warm solve'):
+        with timer.stage(stage):
+            _cached_solve(hb_rooms, inputs, results_cache)
+    return len(hb_rooms)
+
+
+def _cached_solve(hb_rooms, inputs, results_cache):
+    # summer ratios of the rooms as the Honeybee component finds them: keyed by room_hash, computed on a miss
+    from overheating import rooms
+    constructions = rooms.ConstructionTable()
+    ratios = []
+    for room in hb_rooms:
+        key = rooms.room_hash(room, constructions)
+        ratio = results_cache.get(key)
+        if ratio is None:
+            gains, loss, floors = rooms.monthly_heat_balance(room, inputs, constructions=constructions)
+            ratio = sap.summer_ratio(gains[0], loss)
+            results_cache.put(key, ratio)
+        ratios.append(ratio)
+    return ratios
+
+
+def measure(run, data, repeat):
+    """Best stage times of repeat runs, rooms/s of the stages and of the end to end run, and the peak memory."""
+    best = None
+    for _ in range(repeat):
+        timer = profiling.Profiler()
+        n_rooms = run(data, timer)
+        best = timer.times if best is None else OrderedDict((k, min(v, timer.times[k])) for k, v in best.items())
+    tracemalloc.start()
+    run(data, profiling.Profiler())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    stage_total = sum(seconds for stage, seconds in best.items() if stage not in WHOLE_RUNS)
+    return OrderedDict([('rooms', n_rooms), ('stages_s', best),
+        ('stages_rooms_per_s', n_rooms / stage_total if stage_total else math.inf),
+        ('end_to_end_rooms_per_s', n_rooms / best['end to end'] if best['end to end'] else math.inf),
+        ('peak_memory_mb', peak / 1e6)])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description=__doc__.split('\n')[0])
+    parser.add_argument('--rooms', type=int, default=1000, help='Number of rooms (masses)')
+    parser.add_argument('--faces', type=int, default=6, help='Faces per room')
+    parser.add_argument('--apertures', type=int, default=1, help='Apertures per wall (Honeybee engine)')
+    parser.add_argument('--shades', type=int, default=1, help='Shades per aperture (Honeybee engine)')
+    parser.add_argument('--engine', choices=('massing', 'honeybee', 'both'), default='both')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per engine, the best time of each stage is kept')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', default='bench_output.txt', help='Results file (JSON lines, appended to)')
+    args = parser.parse_args(argv)
+
+    record = OrderedDict([('time', time.strftime('%Y-%m-%dT%H:%M:%S')), ('python', platform.python_version()),
+        ('numpy', np.__version__), ('parameters', vars(args)), ('engines', OrderedDict())])
+    if args.engine in ('massing', 'both'):
+        model = synthetic.massing(args.rooms, args.faces, args.seed)
+        record['engines']['massing'] = measure(massing_engine, model, args.repeat)
+    if args.engine in ('honeybee', 'both'):
+        hb_rooms = synthetic.honeybee_rooms(args.rooms, args.faces, args.apertures, args.shades, args.seed)
+        record['engines']['honeybee'] = measure(honeybee_engine, hb_rooms, args.repeat)
+    with open(args.output, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+    for name, result in record['engines'].items():
+        sys.stdout.write("{}: {:.0f} rooms/s end to end, {:.1f} MB peak\n".format(name,
+            result['end_to_end_rooms_per_s'], result['peak_memory_mb']))
+        for stage, seconds in result['stages_s'].items():
+            sys.stdout.write("    {:<20} {:9.4f} s\n".format(stage, seconds))
+
+
+if __name__ == '__main__':
+    main()
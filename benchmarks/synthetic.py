@@ -0,0 +1,84 @@
+"""Synthetic dwellings for the benchmarks: massing models for the vectorized engine and Honeybee rooms.
+Room count, faces per room, apertures per face and shades per aperture are all controllable and the
+generators are seeded so that every run of a benchmark scores the same model.
+"""
+#Copyright (c) 2021, Hamidreza Shahriari
+__author__ = "Hamidreza"
+
+import math
+import random
+
+import numpy as np
+
+
+def massing(n_rooms, faces_per_room=6, seed=0):
+    """Face normals, areas and sizes of n_rooms masses, as the SAP_Standalone component extracts them.
+
+    Every mass has a floor, a roof (flat or pitched) and faces_per_room - 2 walls facing random directions.
+    Returns a dict of arrays: room, normal (n x 3), area, window_height, window_width, and volume per room.
+    """
+    rng = np.random.RandomState(seed)
+    n_walls = max(faces_per_room - 2, 1)
+    room = np.repeat(np.arange(n_rooms), n_walls + 2)
+    azimuth = rng.uniform(0, 2 * math.pi, (n_rooms, n_walls + 2))
+    incl = np.empty((n_rooms, n_walls + 2))
+    incl[:, :n_walls] = rng.normal(90, 2, (n_rooms, n_walls))
+    incl[:, n_walls] = np.where(rng.uniform(size=n_rooms) < 0.5, 0.0, rng.uniform(20, 45, n_rooms))
+    incl[:, n_walls + 1] = 180.0
+    incl = np.radians(incl.ravel())
+    azimuth = azimuth.ravel()
+    normal = np.stack([np.sin(incl) * np.sin(azimuth), np.sin(incl) * np.cos(azimuth), np.cos(incl)], axis=1)
+    return {'room': room, 'normal': normal, 'area': rng.uniform(6, 25, len(room)),
+        'window_height': rng.uniform(1.0, 2.4, len(room)), 'window_width': rng.uniform(0.6, 3.0, len(room)),
+        'volume': rng.uniform(40, 250, n_rooms)}
+
+
+def _aperture_faces(face, count):
+    # count side by side window rectangles (Face3D) on a vertical wall, facing the same way as the wall
+    from ladybug_geometry.geometry3d.face import Face3D
+    from ladybug_geometry.geometry3d.pointvector import Point3D
+    bottom = sorted(face.geometry.vertices, key=lambda pt: pt.z)[:2]
+    a, b = bottom
+    windows = []
+    for i in range(count):
+        t0, t1 = (i + 0.2) / count, (i + 0.8) / count
+        p0 = a + (b - a) * t0
+        p1 = a + (b - a) * t1
+        points = [Point3D(p0.x, p0.y, 0.9), Point3D(p1.x, p1.y, 0.9), Point3D(p1.x, p1.y, 2.1), Point3D(p0.x, p0.y, 2.1)]
+        window = Face3D(points)
+        if window.normal.dot(face.normal) < 0:
+            window = window.flip()
+        windows.append(window)
+    return windows
+
+
+def honeybee_rooms(n_rooms, faces_per_room=6, apertures_per_face=1, shades_per_aperture=1, seed=0):
+    """n_rooms Honeybee rooms extruded from random convex footprints with faces_per_room - 2 walls (at least 3).
+
+    Every wall gets apertures_per_face windows (random operability) and every window shades_per_aperture louvers.
+    """
+    from honeybee.aperture import Aperture
+    from honeybee.room import Room
+    from ladybug_geometry.geometry3d.face import Face3D
+    from ladybug_geometry.geometry3d.pointvector import Point3D
+    from ladybug_geometry.geometry3d.polyface import Polyface3D
+    rnd = random.Random(seed)
+    sides = max(faces_per_room - 2, 3)
+    result = []
+    for r in range(n_rooms):
+        radius = rnd.uniform(2.5, 5)
+        origin = Point3D((r % 100) * 12, (r // 100) * 12, 0)
+        rotation = rnd.uniform(0, 2 * math.pi)
+        footprint = Face3D([Point3D(origin.x + radius * math.cos(rotation + 2 * math.pi * i / sides),
+            origin.y + radius * math.sin(rotation + 2 * math.pi * i / sides), 0) for i in range(sides)])
+        room = Room.from_polyface3d('Room_{}'.format(r), Polyface3D.from_offset_face(footprint, 2.8))
+        for f, face in enumerate(room.faces):
+            if face.type.name != 'Wall':
+                continue
+            for a, window in enumerate(_aperture_faces(face, apertures_per_face)):
+                aperture = Aperture('Room_{}_Face_{}_Ap_{}'.format(r, f, a), window, is_operable=rnd.random() < 0.7)
+                face.add_aperture(aperture)
+                if shades_per_aperture:
+                    aperture.louvers_by_count(shades_per_aperture, rnd.uniform(0.2, 1.2))
+        result.append(room)
+    return result
@@ -0,0 +1,8 @@
+"""SAP 2012 Appendix P overheating assessment shared by the Grasshopper components.
+
+    tables: lookup tables of SAP Appendix P
+    sap: scalar calculation (IronPython and CPython), used by the Grasshopper components
+    engine: vectorized calculation over columnar room and opening tables (CPython + NumPy)
+"""
+#Copyright (c) 2021, Hamidreza Shahriari
+__author__ = "Hamidreza"
@@ -0,0 +1,155 @@
+"""Headless batch assessment of a directory of Honeybee models (HBJSON), without Rhino.
+
+    python -m overheating.batch MODELS_DIR INPUTS_JSON -o results.csv -j 8
+
+INPUTS_JSON holds the assessment inputs of overheating.rooms.sap_inputs, e.g.
+{"latitude": 51.5, "solar_flux": 191, "ex_t_average": 16.9, "bld_type": 1, "op_type": 2, "z_blinds": 3}.
+The models are spread over a process pool and every room of every model is written as one CSV row
+(one row per summer month with --all-months).
+Models already in the results file are skipped, so an interrupted run is resumed by running it again
+(the completed models are logged next to the results, in results.csv.done). The log also records the inputs and
+months of the run, and a results file written with other inputs or months is not appended to.
+"""
+#Copyright (c) 2021, Hamidreza Shahriari
+__author__ = "Hamidreza"
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+
+from overheating import rooms, hbjson
+
+COLUMNS = ('model', 'identifier', 'display_name', 'month', 'gain', 'loss', 'ratio', 'threshold', 'risk')
+MODEL_EXTENSIONS = ('.hbjson', '.json')
+
+
+def model_files(folder):
+    # HBJSON files of the folder, sorted by name
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder)
+        if name.lower().endswith(MODEL_EXTENSIONS))
+
+
+def assess_model(path, inputs, months=None):
+    # Result rows of every room of an HBJSON model, read one room at a time (one row per month with months)
+    name = os.path.basename(path)
+    rows = []
+    for row in hbjson.assess_rooms(path, inputs, months=months):
+        row['model'] = name
+        rows.append(row)
+    return rows
+
+
+def _worker(args):
+    path, inputs, months = args
+    try:
+        return path, assess_model(path, rooms.sap_inputs(**inputs), months), None
+    except Exception as error:
+        return path, None, "{}: {}".format(type(error).__name__, error)
+
+
+def done_file(results):
+    # Log of the models whose rows are all in the results file
+    return results + '.done'
+
+
+def run_key(inputs, months=None):
+    # first line of the done log: the inputs and months the rows of the results file were computed with
+    return '#' + json.dumps({'inputs': inputs, 'months': list(months) if months is not None else None},
+        sort_keys=True, default=repr)
+
+
+def completed_models(results, key=None):
+    """Models completely written to an existing results file.
+
+    Rows of models missing from the done log (cut short by an interruption) are removed from the results file.
+    With a key (see run_key), a ValueError is raised when the results were written with other inputs or months.
+    """
+    done = set()
+    logged_key = None
+    if os.path.exists(done_file(results)):
+        with open(done_file(results), encoding='utf-8') as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    continue
+                if line.startswith('#'):
+                    logged_key = line.rstrip('\n')
+                else:
+                    done.add(line.rstrip('\n'))
+    if key is not None and done and logged_key != key:
+        raise ValueError("{} was written with other inputs or months; use another results file or remove it and "
+            "{} to start again".format(results, done_file(results)))
+    if not os.path.exists(results):
+        return done
+    with open(results, newline='', encoding='utf-8') as f:
+        lines = f.read().splitlines(True)
+    kept = lines[:1] + [line for line in lines[1:] if line.endswith('\n')
+        and next(csv.reader([line]))[0] in done]
+    if len(kept) != len(lines):
+        with open(results, 'w', newline='', encoding='utf-8') as f:
+            f.writelines(kept)
+    return done
+
+
+def run(models, inputs, results, processes=None, log=sys.stderr, months=None):
+    """Assess the models into the results CSV file and return the number of rows written.
+
+    With months (indices in tables.MONTHS) every room is written once per month, otherwise for the month input.
+
+    The rows of a model are written at once when its worker finishes and the model is then added to the done log,
+    so a resumed run redoes the models that were not completely written.
+    Models that fail are reported on log and left out, to be retried on the next run. A ValueError is raised when
+    the results file holds rows of a run with other inputs or months.
+    """
+    rooms.sap_inputs(**inputs)  # fail early on invalid inputs
+    key = run_key(inputs, months)
+    done = completed_models(results, key)
+    todo = [path for path in models if os.path.basename(path) not in done]
+    new_file = not os.path.exists(results) or os.path.getsize(results) == 0
+    written = 0
+    with open(results, 'a', newline='', encoding='utf-8') as f, open(done_file(results), 'a', encoding='utf-8') as done_log:
+        writer = csv.DictWriter(f, COLUMNS)
+        if new_file:
+            writer.writeheader()
+        if not done:
+            done_log.write(key + '\n')
+            done_log.flush()
+        pool = multiprocessing.Pool(processes)
+        try:
+            for path, rows, error in pool.imap_unordered(_worker, [(path, inputs, months) for path in todo]):
+                if error:
+                    log.write("Failed {}: {}\n".format(path, error))
+                    continue
+                writer.writerows(rows)
+                f.flush()
+                done_log.write(os.path.basename(path) + '\n')
+                done_log.flush()
+                written += len(rows)
+        finally:
+            pool.terminate()
+            pool.join()
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m overheating.batch', description=__doc__.split('\n')[0])
+    parser.add_argument('models', help='Directory of HBJSON models')
+    parser.add_argument('inputs', help='JSON file of the assessment inputs')
+    parser.add_argument('-o', '--output', default='overheating_results.csv', help='Results CSV file (appended to)')
+    parser.add_argument('-j', '--processes', type=int, default=None, help='Number of worker processes (default: all cores)')
+    parser.add_argument('--all-months', action='store_true', help='Assess every summer month (June, July, August) in one pass')
+    args = parser.parse_args(argv)
+    with open(args.inputs) as f:
+        inputs = json.load(f)
+    try:
+        written = run(model_files(args.models), inputs, args.output, args.processes,
+            months=rooms.ALL_MONTHS if args.all_months else None)
+    except ValueError as error:
+        parser.error(str(error))
+    sys.stderr.write("{} rows written to {}\n".format(written, args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Per-element breakdown of the heat balance: one row per exterior wall, window, roof and ventilation term.
+The rows are kept in typed columns (array.array) and saved as an uncompressed .npz file, written without NumPy
+so that the Grasshopper components (IronPython) can save it. In CPython, load() memory-maps the columns of the file
+so breakdowns of millions of windows are filtered and aggregated without reading them into Python objects.
+"""
+#Copyright (c) 2021, Hamidreza Shahriari
+__author__ = "Hamidreza"
+
+import struct
+import sys
+import zipfile
+from array import array
+from collections import OrderedDict
+
+# Columns: room index, element code, orientation key (-1 when not oriented), area (m2), solar flux on the surface
+# (W/m2), shading factor Z, solar gain (W) and heat loss (W/K). Rows other than windows have no flux, Z or gain.
+COLUMNS = ('room', 'element', 'orientation', 'area', 'flux', 'z', 'gain', 'loss')
+TYPECODES = {'room': 'i', 'element': 'b', 'orientation': 'b', 'area': 'd', 'flux': 'd', 'z': 'd', 'gain': 'd',
+    'loss': 'd'}
+ELEMENTS = ['wall', 'window', 'roof', 'ventilation']
+WALL, WINDOW, ROOF, VENTILATION = range(4)
+NO_ORIENTATION = -1
+
+_NPY_MAGIC = b'\x93NUMPY\x01\x00'
+_NPY_ALIGNMENT = 64
+
+
+def wall_row(orientation, area, loss):
+    return (WALL, orientation, area, 0.0, 0.0, 0.0, loss)
+
+
+def window_row(orientation, area, flux, z, gain, loss):
+    return (WINDOW, orientation, area, flux, z, gain, loss)
+
+
+def roof_row(area, loss):
+    return (ROOF, NO_ORIENTATION, area, 0.0, 0.0, 0.0, loss)
+
+
+def ventilation_row(loss):
+    return (VENTILATION, NO_ORIENTATION, 0.0, 0.0, 0.0, 0.0, loss)
+
+
+class Breakdown(object):
+    """Columnar table of the rows (see COLUMNS) of every room."""
+
+    def __init__(self):
+        self.columns = OrderedDict((name, array(TYPECODES[name])) for name in COLUMNS)
+
+    def __len__(self):
+        return len(self.columns['room'])
+
+    def extend(self, room, rows):
+        # rows of one room as tuples of the columns after room (see wall_row, window_row, ...)
+        self.columns['room'].extend([room] * len(rows))
+        for name, values in zip(COLUMNS[1:], zip(*rows) if rows else [()] * (len(COLUMNS) - 1)):
+            self.columns[name].extend(values)
+
+    def save(self, path):
+        """Save the columns as an uncompressed .npz file (one .npy member per column)."""
+        save_npz(path, self.columns)
+
+
+def _npy(values):
+    # .npy file (format version 1.0) of a one dimensional array.array
+    if sys.byteorder == 'big' and values.itemsize > 1:
+        values = array(values.typecode, values)
+        values.byteswap()
+    kind = {'b': 'i', 'i': 'i', 'l': 'i', 'd': 'f', 'f': 'f'}[values.typecode]
+    descr = '|i1' if values.itemsize == 1 else '<{}{}'.format(kind, values.itemsize)
+    header = "{{'descr': '{}', 'fortran_order': False, 'shape': ({},), }}".format(descr, len(values))
+    padding = -(len(_NPY_MAGIC) + 2 + len(header) + 1) % _NPY_ALIGNMENT
+    header = header + ' ' * padding + '\n'
+    data = values.tobytes() if hasattr(values, 'tobytes') else values.tostring()
+    return _NPY_MAGIC + struct.pack('<H', len(header)) + header.encode('latin1') + data
+
+
+def save_npz(path, columns):
+    # .npz file of named one dimensional array.array columns, stored without compression so it can be memory-mapped
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_STORED) as npz:
+        for name, values in columns.items():
+            npz.writestr(name + '.npy', _npy(values))
+
+
+def load(path, mmap=True):
+    """Columns of a breakdown .npz file as a dict of NumPy arrays (CPython only).
+
+    With mmap the arrays are read-only memory maps of the file, otherwise they are read into memory.
+    """
+    import numpy as np
+    if not mmap:
+        with np.load(path) as npz:
+            return dict((name, npz[name]) for name in npz.files)
+    columns = {}
+    with zipfile.ZipFile(path) as npz, open(path, 'rb') as f:
+        for info in npz.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError("{} is compressed and can not be memory-mapped".format(info.filename))
+            # the member data follows its local header (30 bytes, the file name and the extra field)
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = struct.unpack('<HH', f.read(4))
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            if np.lib.format.read_magic(f) == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if shape[0] == 0:
+                # an empty file region can not be mapped
+                columns[info.filename[:-4]] = np.empty(shape, dtype)
+            else:
+                columns[info.filename[:-4]] = np.memmap(path, dtype=dtype, mode='r', offset=f.tell(), shape=shape)
+    return columns
@@ -0,0 +1,107 @@
+"""Result cache kept between Grasshopper solves (usually in scriptcontext.sticky).
+Rooms are keyed by a fingerprint of their geometry and properties so that only the rooms that changed,
+and the rooms touching them, are recomputed when a designer edits a model.
+"""
+#Copyright (c) 2021, Hamidreza Shahriari
+__author__ = "Hamidreza"
+
+from collections import OrderedDict
+
+from overheating import tables
+
+DEFAULT_MAXSIZE = 4096
+# Number of decimals of the coordinates used in the fingerprints (1e-6 model units)
+DIGITS = 6
+
+
+class LRUCache(object):
+    """Mapping that keeps at most maxsize entries and drops the least recently used one first."""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        if key not in self._entries:
+            self.misses += 1
+            return default
+        self.hits += 1
+        value = self._entries.pop(key)
+        self._entries[key] = value
+        return value
+
+    def put(self, key, value):
+        self._entries.pop(key, None)
+        self._entries[key] = value
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+class PreviewCache(object):
+    """Preview geometry of the rooms, built on first use and recoloured only when the risk band of a room changes.
+
+    The uncoloured geometry (meshes, wireframes) is kept per geometry key, the coloured geometry per key with the
+    band it was coloured for.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.geometry = LRUCache(maxsize)
+        self.coloured = LRUCache(maxsize)
+
+    @property
+    def maxsize(self):
+        return self.geometry.maxsize
+
+    @maxsize.setter
+    def maxsize(self, maxsize):
+        self.geometry.maxsize = maxsize
+        self.coloured.maxsize = maxsize
+
+    def get(self, key, band, build, colour):
+        """Coloured preview of the room: colour(build(), tables.RISK_COLORS[band]), reusing the cached geometry."""
+        entry = self.coloured.get(key)
+        if entry is not None and entry[0] == band:
+            return entry[1]
+        geometry = self.geometry.get(key)
+        if geometry is None:
+            geometry = build()
+            self.geometry.put(key, geometry)
+        coloured = colour(geometry, tables.RISK_COLORS[band])
+        self.coloured.put(key, (band, coloured))
+        return coloured
+
+    def clear(self):
+        self.geometry.clear()
+        self.coloured.clear()
+
+
+def sticky_cache(sticky, name, maxsize=DEFAULT_MAXSIZE, cache_type=LRUCache):
+    # The cache (an LRUCache or a PreviewCache) stored under name in the sticky dictionary, created on the first solve
+    cache = sticky.get(name)
+    if not isinstance(cache, cache_type):
+        cache = cache_type(maxsize)
+        sticky[name] = cache
+    cache.maxsize = maxsize
+    return cache
+
+
+def fingerprint(values, digits=DIGITS):
+    # Hashable key of a nested sequence of numbers and strings, floats rounded to the given decimals
+    if isinstance(values, float):
+        return round(values, digits)
+    if isinstance(values, (list, tuple)):
+        return tuple(fingerprint(value, digits) for value in values)
+    return values
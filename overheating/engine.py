@@ -0,0 +1,236 @@
+"""Vectorized SAP 2012 Appendix P calculation for many rooms at once (CPython + NumPy).
+The inputs are columnar tables: one row per glazed opening and one row per room, each a dict of
+equal-length NumPy arrays. Openings refer to their room by its row index, so a whole housing scheme
+is scored with a handful of array operations instead of a Python loop over faces.
+"""
+#Copyright (c) 2021, Hamidreza Shahriari
+__author__ = "Hamidreza"
+
+import numpy as np
+
+from overheating import tables
+
+K_VALUES = np.array(tables.K_VALUES)
+BLIND_FACTORS = np.append(tables.BLIND_FACTORS, 1.0)  # last entry: no blinds (code -1)
+SOLAR_ACCESS_FACTORS = np.array(tables.SOLAR_ACCESS_FACTORS, dtype=float)
+OVERHANG_FACTORS = np.array([tables.OVERHANG_NARROW, tables.OVERHANG_WIDE], dtype=float)
+AIR_CHANGE_RATES = np.array(tables.AIR_CHANGE_RATES, dtype=float)
+
+# Default values of the optional opening columns
+OPENING_DEFAULTS = {'inclination': 90.0, 'g_value': 0.0, 'frame_factor': tables.DEFAULT_FRAME_FACTOR,
+    'u_value': 0.0, 'overhang': 0.0, 'window_height': 1.0, 'window_width': 1.0, 'blinds': -1,
+    'time_fraction': 0.0, 'solar_access': 0.0}
+ROOM_DEFAULTS = {'fabric_loss': 0.0, 'air_change_rate': 0.0}
+INT_COLUMNS = ('room', 'orientation', 'blinds')
+
+
+def _column(name, value):
+    return np.asarray(value, dtype=int if name in INT_COLUMNS else float)
+
+
+def _table(columns, required, defaults):
+    missing = [name for name in required if name not in columns]
+    if missing:
+        raise ValueError("Missing columns: {}".format(", ".join(missing)))
+    unknown = [name for name in columns if name not in required and name not in defaults]
+    if unknown:
+        raise ValueError("Unknown columns: {}".format(", ".join(unknown)))
+    table = dict((name, _column(name, value)) for name, value in columns.items())
+    sizes = set(len(column) for column in table.values() if column.ndim == 1)
+    if len(sizes) != 1:
+        raise ValueError("Columns must be 1D arrays of the same length (or scalars)")
+    size = sizes.pop()
+    for name in defaults:
+        table.setdefault(name, _column(name, defaults[name]))
+    for name in table:
+        table[name] = np.broadcast_to(table[name], (size,))
+    return table
+
+
+def opening_table(**columns):
+    """Columnar table of glazed openings.
+
+    Required columns are room (row index of the room), area (m2) and orientation (tables.NORTH ... tables.SOUTH);
+    the others fall back to OPENING_DEFAULTS. Scalars are broadcast to every row.
+    """
+    return _table(columns, ('room', 'area', 'orientation'), OPENING_DEFAULTS)
+
+
+def room_table(**columns):
+    """Columnar table of rooms.
+
+    volume (m3) is required; fabric_loss is the heat loss (W/K) of the opaque walls, roofs, thermal bridging and
+    any element that is not a row of the opening table, air_change_rate the ventilation rate (ach).
+    """
+    return _table(columns, ('volume',), ROOM_DEFAULTS)
+
+
+def orientation_key(vector_angle):
+    # Orientation codes from the angles (degrees) between the surface normals and North
+    return np.minimum(np.asarray(vector_angle, dtype=float) // 36, tables.SOUTH).astype(int)
+
+
+def conversion_coefficients(orientation, inclination):
+    # Coefficients A, B and C of the conversion factors, which only depend on the orientation and the inclination
+    k = K_VALUES[orientation]
+    sin_half = np.sin(np.radians(np.asarray(inclination, dtype=float) / 2))
+    sin_sq = sin_half ** 2
+    sin_cube = sin_sq * sin_half
+    A = k[..., 0] * sin_cube + k[..., 1] * sin_sq + k[..., 2] * sin_half
+    B = k[..., 3] * sin_cube + k[..., 4] * sin_sq + k[..., 5] * sin_half
+    C = k[..., 6] * sin_cube + k[..., 7] * sin_sq + k[..., 8] * sin_half + 1
+    return A, B, C
+
+
+def conversion_factor(orientation, inclination, latitude, month_Solar_declination):
+    # Conversion factors (Rh) of the horizontal solar flux to surfaces with the given orientations and inclinations
+    A, B, C = conversion_coefficients(orientation, inclination)
+    cos_delta = np.cos(np.radians(np.asarray(latitude, dtype=float) - month_Solar_declination))
+    return A * cos_delta ** 2 + B * cos_delta + C
+
+
+def solar_access_factor(solar_acces):
+    return SOLAR_ACCESS_FACTORS[np.searchsorted(tables.SOLAR_ACCESS_BINS, solar_acces, side='left')]
+
+
+def blind_factor(blinds, time_fraction):
+    # Blinds code -1 means no blinds; a time fraction of 0 means the blinds are used all day (as in sap.blind_factor)
+    time_fraction = np.where(np.asarray(time_fraction) > 0, time_fraction, 1.0)
+    return time_fraction * BLIND_FACTORS[blinds] + (1 - time_fraction)
+
+
+def depth_bin(d_factor):
+    return np.searchsorted(tables.DEPTH_BINS, d_factor, side='right')
+
+
+def overhang_ratio_factor(orientation, depth_ratio, width_ratio):
+    # Overhang factors from the ratios of the overhang depths to the window heights and widths: one index into table P4
+    depth_ratio = np.asarray(depth_ratio, dtype=float)
+    wide = (depth_ratio > 0) & (np.asarray(width_ratio) >= tables.OVERHANG_WIDTH_RATIO)
+    return OVERHANG_FACTORS[wide.astype(int), orientation, depth_bin(np.maximum(depth_ratio, 0.0))]
+
+
+def overhang_factor(orientation, overhang, window_height, window_width):
+    overhang = np.asarray(overhang, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d_factor = np.where(overhang > 0, overhang / window_height, 0.0)
+        w_factor = np.where(overhang > 0, overhang / window_width, 0.0)
+    return overhang_ratio_factor(orientation, d_factor, w_factor)
+
+
+def z_summer(orientation, solar_acces, blinds, time_fraction, overhang, window_height, window_width):
+    # Summer solar shading factors (Z) combining solar access, overhangs and blinds
+    access = solar_access_factor(solar_acces)
+    overhang_result = overhang_factor(orientation, overhang, window_height, window_width)
+    return blind_factor(blinds, time_fraction) * (access + overhang_result - 1)
+
+
+def air_change_rate(op_type, bld_type):
+    # Air change rates of SAP table P1; building type -1 is a room without openable windows
+    op_type = np.asarray(op_type, dtype=int)
+    bld_type = np.asarray(bld_type, dtype=int)
+    return np.where(bld_type == -1, 0.01, AIR_CHANGE_RATES[op_type, np.maximum(bld_type, 0)])
+
+
+def threshold_temperature(TMP, Summer_ratio, ex_t_average):
+    TMP = np.asarray(TMP, dtype=float)
+    delta_t_mass = np.where(TMP < tables.TMP_LIMIT, 2.0 - 0.007 * TMP, 0.0)
+    return ex_t_average + Summer_ratio + delta_t_mass
+
+
+def risk_band(temp_thresh):
+    # Indices of the likelihood of high internal temperature in tables.RISK_LEVELS
+    return np.searchsorted(tables.RISK_BINS, temp_thresh, side='right')
+
+
+def opening_shading(openings):
+    # Z factor of every opening of an opening table
+    return z_summer(openings['orientation'], openings['solar_access'], openings['blinds'], openings['time_fraction'],
+        openings['overhang'], openings['window_height'], openings['window_width'])
+
+
+def opening_gains(openings, solar_flux, latitude, month_Solar_declination, shade_factor=None):
+    # Solar gain (W) of every opening of an opening table
+    if shade_factor is None:
+        shade_factor = opening_shading(openings)
+    s_flux = solar_flux * conversion_factor(openings['orientation'], openings['inclination'], latitude,
+        month_Solar_declination)
+    return (tables.SOLAR_INCIDENCE * openings['area'] * openings['frame_factor'] * s_flux * shade_factor
+        * openings['g_value'])
+
+
+def room_losses(openings, rooms):
+    # Total heat loss (W/K) of every room: fabric, openings and ventilation
+    n_rooms = len(rooms['volume'])
+    loss = np.bincount(openings['room'], weights=openings['area'] * openings['u_value'], minlength=n_rooms)
+    return loss + rooms['fabric_loss'] + tables.AIR_HEAT_CAPACITY * rooms['air_change_rate'] * rooms['volume']
+
+
+def assess(openings, rooms, solar_flux, latitude, month_Solar_declination, ex_t_average, TMP=tables.DEFAULT_TMP):
+    """Assess the likelihood of high internal temperature of every room.
+
+    Returns a dict of per-room arrays: gain (W), loss (W/K), ratio (K), threshold (C) and band (index in
+    tables.RISK_LEVELS). Rooms without any loss get a ratio of 0.
+    """
+    n_rooms = len(rooms['volume'])
+    gain = np.bincount(openings['room'], weights=opening_gains(openings, solar_flux, latitude,
+        month_Solar_declination), minlength=n_rooms)
+    loss = room_losses(openings, rooms)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(loss > 0, gain / loss, 0.0)
+    threshold = threshold_temperature(TMP, ratio, ex_t_average)
+    return {'gain': gain, 'loss': loss, 'ratio': ratio, 'threshold': threshold, 'band': risk_band(threshold)}
+
+
+def assess_months(openings, rooms, solar_flux, latitude, ex_t_average, months=(0, 1, 2), TMP=tables.DEFAULT_TMP):
+    """Assess every room in every month (indices in tables.MONTHS) in one pass.
+
+    solar_flux and ex_t_average are single values or one value per month of months. The shading and the losses
+    are computed once, only the solar flux changes from month to month. Returns the same dict as assess, with
+    gain, ratio, threshold and band of shape (rooms, months).
+    """
+    n_rooms = len(rooms['volume'])
+    months = np.asarray(months, dtype=int)
+    declination = np.asarray(tables.SOLAR_DECLINATION)[months]
+    solar_flux = np.broadcast_to(np.asarray(solar_flux, dtype=float), months.shape)
+    gains = opening_gains(openings, solar_flux[:, None], latitude, declination[:, None])
+    # one bincount over (month, room) pairs
+    index = (np.arange(len(months))[:, None] * n_rooms + openings['room']).ravel()
+    gain = np.bincount(index, weights=gains.ravel(), minlength=len(months) * n_rooms).reshape(len(months), n_rooms).T
+    loss = room_losses(openings, rooms)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(loss[:, None] > 0, gain / loss[:, None], 0.0)
+    threshold = threshold_temperature(TMP, ratio, np.asarray(ex_t_average, dtype=float))
+    return {'gain': gain, 'loss': loss, 'ratio': ratio, 'threshold': threshold, 'band': risk_band(threshold)}
+
+
+def assess_regions(openings, rooms, regions=None, months=(0, 1, 2), TMP=tables.DEFAULT_TMP):
+    """Assess every room in every SAP climate region (indices in tables.REGIONS, default all) and month.
+
+    The shading, the conversion coefficients and the losses are summed per room once; the regions and months only
+    enter through the latitude, solar flux and external temperature of tables U1, U3 and U4. Returns the same dict
+    as assess, with gain, ratio, threshold and band of shape (rooms, regions, months).
+    """
+    n_rooms = len(rooms['volume'])
+    regions = np.arange(len(tables.REGIONS)) if regions is None else np.asarray(regions, dtype=int)
+    months = np.asarray(months, dtype=int)
+    weight = (tables.SOLAR_INCIDENCE * openings['area'] * openings['frame_factor'] * opening_shading(openings)
+        * openings['g_value'])
+    A, B, C = [np.bincount(openings['room'], weights=weight * coefficient, minlength=n_rooms)
+        for coefficient in conversion_coefficients(openings['orientation'], openings['inclination'])]
+    latitude = np.asarray(tables.REGION_LATITUDE)[regions]
+    declination = np.asarray(tables.SOLAR_DECLINATION)[months]
+    cos_delta = np.cos(np.radians(latitude[:, None] - declination))
+    solar_flux = np.asarray(tables.REGION_SOLAR_FLUX, dtype=float)[np.ix_(regions, months)]
+    gain = solar_flux * (A[:, None, None] * cos_delta ** 2 + B[:, None, None] * cos_delta + C[:, None, None])
+    loss = room_losses(openings, rooms)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(loss[:, None, None] > 0, gain / loss[:, None, None], 0.0)
+    ex_t_average = np.asarray(tables.REGION_EX_T)[np.ix_(regions, months)]
+    threshold = threshold_temperature(TMP, ratio, ex_t_average)
+    return {'gain': gain, 'loss': loss, 'ratio': ratio, 'threshold': threshold, 'band': risk_band(threshold)}
+
+
+def risk_levels(band):
+    # Names of the risk bands
+    return np.array(tables.RISK_LEVELS)[band]
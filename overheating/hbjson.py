@@ -0,0 +1,228 @@
+"""Streaming reader of Honeybee model files (HBJSON) that evaluates one room at a time.
+The file is scanned in chunks; of the top level members other than "rooms" only the units and the energy
+properties holding the constructions are loaded (the others, such as orphaned shades, are skipped while they are
+scanned) and every element of "rooms" is parsed, rebuilt as a Honeybee Room in meters and assessed on its own, so
+the peak memory is bounded by the largest room instead of the model.
+"""
+#Copyright (c) 2021, Hamidreza Shahriari
+__author__ = "Hamidreza"
+
+import json
+import re
+
+from honeybee.room import Room
+from honeybee.units import conversion_factor_to_meters
+from honeybee_energy.properties.model import ModelEnergyProperties
+
+from overheating import rooms
+
+CHUNK_SIZE = 1 << 20
+# Top level members of the model loaded besides the rooms
+MODEL_KEYS = ('units', 'properties')
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"')
+# strings (the closing quote is captured to find strings cut by the end of the buffer) and brackets
+_BRACKETS = re.compile(r'"(?:[^"\\]|\\.)*(")?|[\[\]{}]')
+_SCALAR = re.compile(r'[^,}\]\s]+')
+_SPACE = re.compile(r'\s*')
+
+
+class _Scanner(object):
+    """Buffer over a text file that is filled chunk by chunk and emptied once its content has been used."""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, skip=False):
+        # read the next chunk; when skipping a value, what has been read of it is dropped first
+        if skip:
+            self.compact()
+        if self.eof:
+            raise ValueError("Unexpected end of the HBJSON file")
+        chunk = self.f.read(self.chunk_size)
+        self.eof = not chunk
+        self.buf += chunk
+
+    def compact(self):
+        # drop what has been read already
+        self.buf = self.buf[self.pos:]
+        self.pos = 0
+
+    def peek(self):
+        # next character that is not a white space
+        while True:
+            self.pos = _SPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            self.fill()
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError("Expected '{}' in the HBJSON file, found '{}'".format(char, self.buf[self.pos]))
+        self.pos += 1
+
+    def read_value(self, skip=False):
+        # text of the JSON value at the current position (None with skip, the value is then not kept in memory)
+        start = self.pos
+        char = self.peek()
+        if char == '"':
+            match = _STRING.match(self.buf, self.pos)
+            while match is None:
+                self.fill(skip)
+                match = _STRING.match(self.buf, self.pos)
+            self.pos = match.end()
+        elif char in '[{':
+            depth = 0
+            while True:
+                match = _BRACKETS.search(self.buf, self.pos)
+                if match is None or (match.group().startswith('"') and match.group(1) is None):
+                    # the rest of the value (or of a string) is in the next chunk
+                    self.pos = match.start() if match is not None else len(self.buf)
+                    self.fill(skip)
+                    continue
+                self.pos = match.end()
+                token = match.group()
+                if token == '[' or token == '{':
+                    depth += 1
+                elif token == ']' or token == '}':
+                    depth -= 1
+                    if depth == 0:
+                        break
+        else:
+            match = _SCALAR.match(self.buf, self.pos)
+            while match.end() == len(self.buf) and not self.eof:
+                self.fill(skip)
+                match = _SCALAR.match(self.buf, self.pos)
+            self.pos = match.end()
+        if skip:
+            return None
+        return self.buf[start:self.pos]
+
+
+def iter_members(path, load_rooms=True, chunk_size=CHUNK_SIZE, keys=None):
+    """Top level members of an HBJSON file as (key, value) pairs, in file order.
+
+    Every element of the "rooms" array is yielded on its own as ('rooms', room_dict), or as ('rooms', None) when
+    load_rooms is False, to skip the rooms without parsing them. With keys, the other members are only yielded when
+    their key is in keys and skipped without being parsed otherwise.
+    """
+    with open(path, encoding='utf-8-sig') as f:
+        scanner = _Scanner(f, chunk_size)
+        scanner.expect('{')
+        while True:
+            char = scanner.peek()
+            if char == '}':
+                return
+            if char == ',':
+                scanner.pos += 1
+                continue
+            key = json.loads(scanner.read_value())
+            scanner.expect(':')
+            if key == 'rooms' and scanner.peek() == '[':
+                scanner.pos += 1
+                while True:
+                    char = scanner.peek()
+                    if char == ']':
+                        scanner.pos += 1
+                        break
+                    if char == ',':
+                        scanner.pos += 1
+                        continue
+                    room = scanner.read_value()
+                    scanner.compact()
+                    yield 'rooms', json.loads(room) if load_rooms else None
+            elif keys is not None and key not in keys:
+                scanner.read_value(skip=True)
+                scanner.compact()
+            else:
+                value = scanner.read_value()
+                scanner.compact()
+                yield key, json.loads(value)
+
+
+def model_properties(path, chunk_size=CHUNK_SIZE, keys=MODEL_KEYS):
+    # Top level members of an HBJSON file with the given keys (by default the units and the model properties)
+    return dict((key, value) for key, value in iter_members(path, False, chunk_size, keys) if key != 'rooms')
+
+
+def units_factor(members):
+    # Scale of the model units to meters, in which the SAP calculation is done (honeybee models default to meters)
+    return conversion_factor_to_meters(members.get('units') or 'Meters')
+
+
+def _apply_energy_properties(room, room_dict, energy):
+    # assign the constructions (and construction sets) referenced by the abridged room dictionary
+    constructions, construction_sets, schedules, program_types, hvacs, shws = energy
+    room_energy = room_dict['properties'].get('energy')
+    if room_energy is not None:
+        room.properties.energy.apply_properties_from_dict(room_energy, construction_sets, program_types, hvacs,
+            shws, schedules, constructions)
+    for face, face_dict in zip(room.faces, room_dict['faces']):
+        if 'energy' in face_dict['properties']:
+            face.properties.energy.apply_properties_from_dict(face_dict['properties']['energy'], constructions)
+        for ap, ap_dict in zip(face.apertures, face_dict.get('apertures') or []):
+            if 'energy' in ap_dict['properties']:
+                ap.properties.energy.apply_properties_from_dict(ap_dict['properties']['energy'], constructions)
+
+
+def _load_energy(members):
+    # constructions, construction sets, schedules, programs, hvacs and shws of the model (None without energy properties)
+    data = {'type': 'Model', 'properties': members.get('properties', {})}
+    if 'energy' not in data['properties']:
+        return None
+    _, constructions, construction_sets, _, schedules, program_types, hvacs, shws = \
+        ModelEnergyProperties.load_properties_from_dict(data)
+    return constructions, construction_sets, schedules, program_types, hvacs, shws
+
+
+def _room(room_dict, energy, factor=1):
+    # Honeybee Room of a room dict, with its energy properties and scaled to meters by the units factor
+    room = Room.from_dict(room_dict)
+    if energy is not None:
+        _apply_energy_properties(room, room_dict, energy)
+    if factor != 1:
+        room.scale(factor)
+    return room
+
+
+def iter_rooms(path, chunk_size=CHUNK_SIZE):
+    """Honeybee Rooms of an HBJSON file, with their energy properties and in meters, rebuilt one at a time."""
+    members = {}
+    energy = None
+    factor = 1
+    loaded = False
+    for key, value in iter_members(path, True, chunk_size, MODEL_KEYS):
+        if key != 'rooms':
+            members[key] = value
+            continue
+        if not loaded and any(name not in members for name in MODEL_KEYS):
+            # the units or the model properties come after the rooms (or are missing): read them first, then
+            # stream the rooms again
+            members = model_properties(path, chunk_size)
+            energy, factor = _load_energy(members), units_factor(members)
+            for key, value in iter_members(path, True, chunk_size, ()):
+                if key == 'rooms':
+                    yield _room(value, energy, factor)
+            return
+        if not loaded:
+            energy, factor = _load_energy(members), units_factor(members)
+            loaded = True
+        yield _room(value, energy, factor)
+
+
+def assess_rooms(path, inputs, chunk_size=CHUNK_SIZE, months=None):
+    """Result rows (see overheating.rooms.assess_room) of the rooms of an HBJSON file, as a generator.
+
+    With months (indices in tables.MONTHS) every room yields one row per month, from a single traversal.
+    """
+    # constructions of the model, resolved once
+    constructions = rooms.ConstructionTable()
+    for room in iter_rooms(path, chunk_size):
+        if months is None:
+            yield rooms.assess_room(room, inputs, constructions)
+        else:
+            for row in rooms.assess_room_months(room, inputs, months, constructions):
+                yield row
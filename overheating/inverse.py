@@ -0,0 +1,222 @@
+"""Inverse solver of the massing (SAP_Standalone) workflow: the design values that meet a target risk band (CPython + NumPy).
+Rather than searching, the solver uses the structure of the calculation: the solar gain is linear in the g-value,
+the loss and the gain are linear in the WWR, the overhang factors of SAP table P4 only change at the depth bins and
+the width ratio of every window, and there are four opening types. Every mass of a wall and mass table (see
+overheating.sweep) is solved in one pass.
+"""
+#Copyright (c) 2021, Hamidreza Shahriari
+__author__ = "Hamidreza"
+
+import numpy as np
+
+from overheating import engine, sweep, tables
+
+# Values of the unconstrained designs, returned when every value meets the target
+BOUNDS = {'g_value': 1.0, 'WWR': 1.0, 'overhangs': 0.0, 'opn_type': 0}
+
+
+def _parameters(masses, parameters, solved):
+    # values of the inputs other than the solved one, as scalars or one value per mass
+    unknown = [name for name in parameters if name not in sweep.PARAMETERS or name == solved]
+    if unknown:
+        raise ValueError("Unknown parameters: {}".format(", ".join(unknown)))
+    missing = [name for name in sweep.PARAMETERS
+        if name not in parameters and name not in sweep.PARAMETER_DEFAULTS and name != solved]
+    if missing:
+        raise ValueError("Missing parameters: {}".format(", ".join(missing)))
+    n_masses = len(masses['volume'])
+    values = {}
+    for name in sweep.PARAMETERS:
+        if name != solved:
+            value = parameters.get(name, sweep.PARAMETER_DEFAULTS.get(name))
+            value = np.asarray(value, dtype=int if name in sweep.INT_PARAMETERS else float)
+            values[name] = np.broadcast_to(value, (n_masses,))
+    return values
+
+
+def _ratio_limit(target, TMP, ex_t_average):
+    # Summer ratio (gain / loss) below which the threshold temperature is in the target band or a lower one
+    TMP = np.asarray(TMP, dtype=float)
+    delta_t_mass = np.where(TMP < tables.TMP_LIMIT, 2.0 - 0.007 * TMP, 0.0)
+    return tables.RISK_BINS[target] - ex_t_average - delta_t_mass
+
+
+def _check_target(target):
+    if target not in range(len(tables.RISK_LEVELS)):
+        raise ValueError("target must be the index of a band in tables.RISK_LEVELS")
+    return target == len(tables.RISK_BINS)
+
+
+def _shaded_area(walls, n_masses, latitude, month_Solar_declination, overhang):
+    # Sum of area x Rh x (solar access + overhang factor - 1) of the walls of every mass
+    rh_area = walls['area'] * engine.conversion_factor(walls['orientation'], walls['inclination'], latitude,
+        month_Solar_declination)
+    overhang_result = engine.overhang_factor(walls['orientation'], overhang[walls['room']], walls['window_height'],
+        walls['window_width'])
+    shaded = rh_area * (engine.solar_access_factor(walls['solar_access']) + overhang_result - 1)
+    return np.bincount(walls['room'], weights=shaded, minlength=n_masses)
+
+
+def _gain_factor(p, solar_flux):
+    # Gain per unit of shaded area x WWR x g-value
+    return tables.SOLAR_INCIDENCE * solar_flux * p['FF'] * engine.blind_factor(p['curt_blind'], p['time_fraction'])
+
+
+def _losses(walls, masses, p):
+    # Loss of the walls without windows and of the roof, and the extra loss of the windows per unit of WWR
+    wall_area = np.bincount(walls['room'], weights=walls['area'], minlength=len(masses['volume']))
+    fixed = (wall_area * (p['U_wall'] + tables.THERMAL_BRIDGING) + masses['roof_area'] * (p['U_roof']
+        + tables.THERMAL_BRIDGING))
+    return fixed, wall_area * (p['U_window'] - p['U_wall'])
+
+
+def _ventilation(masses, opn_type):
+    return tables.AIR_HEAT_CAPACITY * engine.air_change_rate(opn_type, masses['bld_type']) * masses['volume']
+
+
+def _forward_band(walls, masses, solar_flux, latitude, month_Solar_declination, ex_t_average, p):
+    # Risk band of every mass with the per-mass values p, in the arithmetic of overheating.sweep.sweep
+    n_masses = len(masses['volume'])
+    shaded = _shaded_area(walls, n_masses, latitude, month_Solar_declination, p['overhangs'])
+    wall_area = np.bincount(walls['room'], weights=walls['area'], minlength=n_masses)
+    gain = sweep._gain(solar_flux, shaded, p['WWR'], p['FF'], p['g_value'],
+        engine.blind_factor(p['curt_blind'], p['time_fraction']))
+    loss = sweep._loss(wall_area, masses['roof_area'], masses['volume'],
+        engine.air_change_rate(p['opn_type'], masses['bld_type']), p['WWR'], p['U_wall'], p['U_window'], p['U_roof'])
+    return engine.risk_band(sweep._threshold(gain, loss, p['TMP'], ex_t_average))
+
+
+def _below_root(root, name, target, forward):
+    # Largest value at or below the root (capped at BOUNDS[name]) that the forward model keeps in the target band.
+    # At the root the threshold temperature is the upper bin of the band, which risk_band puts in the next band, so
+    # the values are stepped down by doubling steps (from one float spacing) until the forward model meets the target.
+    value = np.minimum(root, BOUNDS[name])
+    step = np.spacing(np.where(np.isfinite(value), value, 1.0))
+    for _ in range(128):
+        above = np.isfinite(value) & (forward(value) > target)
+        if not above.any():
+            break
+        value = np.where(above, np.maximum(value - step, 0.0), value)
+        step = np.where(above, step * 2, step)
+    return value
+
+
+def max_g_value(walls, masses, solar_flux, latitude, month_Solar_declination, ex_t_average, target=0, **parameters):
+    """Largest g-value of every mass that keeps it in the target band (index in tables.RISK_LEVELS) or below.
+
+    parameters are the other inputs of overheating.sweep.sweep, as scalars or one value per mass. The result is the
+    largest g-value whose threshold temperature stays below the upper bin of the target band (at most 1), NaN when
+    even a g-value of 0 does not meet the target.
+    """
+    n_masses = len(masses['volume'])
+    if _check_target(target):
+        return np.full(n_masses, BOUNDS['g_value'])
+    p = _parameters(masses, parameters, 'g_value')
+    shaded = _shaded_area(walls, n_masses, latitude, month_Solar_declination, p['overhangs'])
+    gain = _gain_factor(p, solar_flux) * shaded * p['WWR']
+    fixed, windows = _losses(walls, masses, p)
+    limit = _ratio_limit(target, p['TMP'], ex_t_average) * (fixed + p['WWR'] * windows
+        + _ventilation(masses, p['opn_type']))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        g_value = np.where(gain > 0, limit / gain, np.inf)
+    return _below_root(np.where(limit > 0, g_value, np.nan), 'g_value', target, lambda value: _forward_band(walls,
+        masses, solar_flux, latitude, month_Solar_declination, ex_t_average, dict(p, g_value=value)))
+
+
+def max_wwr(walls, masses, solar_flux, latitude, month_Solar_declination, ex_t_average, target=0, **parameters):
+    """Largest window to wall ratio of every mass that keeps it in the target band or below.
+
+    The gain and the loss are both linear in the WWR, so the limit is the root of one linear equation per mass; the
+    result is the largest WWR below it that meets the target (at most 1, NaN when even a WWR of 0 does not).
+    """
+    n_masses = len(masses['volume'])
+    if _check_target(target):
+        return np.full(n_masses, BOUNDS['WWR'])
+    p = _parameters(masses, parameters, 'WWR')
+    shaded = _shaded_area(walls, n_masses, latitude, month_Solar_declination, p['overhangs'])
+    gain = _gain_factor(p, solar_flux) * shaded * p['g_value']
+    fixed, windows = _losses(walls, masses, p)
+    ratio = _ratio_limit(target, p['TMP'], ex_t_average)
+    # gain x WWR < ratio x (fixed + ventilation + windows x WWR)
+    limit = ratio * (fixed + _ventilation(masses, p['opn_type']))
+    slope = gain - ratio * windows
+    with np.errstate(divide='ignore', invalid='ignore'):
+        wwr = np.where(slope > 0, limit / slope, np.inf)
+    return _below_root(np.where(limit > 0, wwr, np.nan), 'WWR', target, lambda value: _forward_band(walls, masses,
+        solar_flux, latitude, month_Solar_declination, ex_t_average, dict(p, WWR=value)))
+
+
+def min_overhang(walls, masses, solar_flux, latitude, month_Solar_declination, ex_t_average, target=0, **parameters):
+    """Smallest overhang depth (m) above the windows of every mass that keeps it in the target band or below.
+
+    The overhang factor of a window only changes at the depths of the bins of SAP table P4 (depth / window height)
+    and of the width ratio (depth / window width), so the shaded area of every mass is a step function of the
+    depth. Its steps are sorted per mass and accumulated, and the first step that meets the target is returned
+    (0 when no overhang is needed, NaN when no depth is deep enough).
+    """
+    n_masses = len(masses['volume'])
+    if _check_target(target):
+        return np.full(n_masses, BOUNDS['overhangs'])
+    p = _parameters(masses, parameters, 'overhangs')
+    # depths at which the overhang factor of every wall changes, sorted per wall
+    depths = np.concatenate([np.nextafter(walls['window_height'][:, None] * np.asarray(tables.DEPTH_BINS), np.inf),
+        (walls['window_width'] * tables.OVERHANG_WIDTH_RATIO)[:, None]], axis=1)
+    depths = np.sort(np.concatenate([np.zeros((len(depths), 1)), depths], axis=1), axis=1)
+    rh_area = walls['area'] * engine.conversion_factor(walls['orientation'], walls['inclination'], latitude,
+        month_Solar_declination)
+    factor = engine.overhang_factor(walls['orientation'][:, None], depths, walls['window_height'][:, None],
+        walls['window_width'][:, None])
+    shaded = rh_area[:, None] * (engine.solar_access_factor(walls['solar_access'])[:, None] + factor - 1)
+    base = np.bincount(walls['room'], weights=shaded[:, 0], minlength=n_masses)
+
+    # one step per wall and depth, sorted by mass and depth, accumulated per mass
+    room = np.repeat(walls['room'], depths.shape[1] - 1)
+    depth = depths[:, 1:].ravel()
+    step = np.diff(shaded, axis=1).ravel()
+    order = np.lexsort((depth, room))
+    room, depth, step = room[order], depth[order], step[order]
+    total = np.cumsum(step)
+    first = np.searchsorted(room, room)
+    accumulated = base[room] + total - (total[first] - step[first])
+
+    gain = _gain_factor(p, solar_flux) * p['WWR'] * p['g_value']
+    fixed, windows = _losses(walls, masses, p)
+    limit = _ratio_limit(target, p['TMP'], ex_t_average) * (fixed + p['WWR'] * windows
+        + _ventilation(masses, p['opn_type']))
+    # only the last step of equal depths gives the shaded area at that depth
+    last = np.append((room[1:] != room[:-1]) | (depth[1:] != depth[:-1]), True)
+    meets = last & (gain[room] * accumulated < limit[room])
+    result = np.full(n_masses, np.nan)
+    masses_met, index = np.unique(room[meets], return_index=True)
+    result[masses_met] = depth[meets][index]
+    return np.where(gain * base < limit, BOUNDS['overhangs'], result)
+
+
+def min_opn_type(walls, masses, solar_flux, latitude, month_Solar_declination, ex_t_average, target=0, **parameters):
+    """Lowest opening type of SAP table P1 (0 trickle vents ... 3 windows fully open) of every mass that keeps it in
+    the target band or below, -1 when none does.
+    """
+    n_masses = len(masses['volume'])
+    if _check_target(target):
+        return np.full(n_masses, BOUNDS['opn_type'])
+    p = _parameters(masses, parameters, 'opn_type')
+    shaded = _shaded_area(walls, n_masses, latitude, month_Solar_declination, p['overhangs'])
+    gain = _gain_factor(p, solar_flux) * shaded * p['WWR'] * p['g_value']
+    fixed, windows = _losses(walls, masses, p)
+    # loss with every opening type
+    op_types = np.arange(len(tables.AIR_CHANGE_RATES))
+    ventilation = (tables.AIR_HEAT_CAPACITY * engine.air_change_rate(op_types[None, :], masses['bld_type'][:, None])
+        * masses['volume'][:, None])
+    loss = (fixed + p['WWR'] * windows)[:, None] + ventilation
+    meets = gain[:, None] < _ratio_limit(target, p['TMP'], ex_t_average)[:, None] * loss
+    return np.where(meets.any(axis=1), meets.argmax(axis=1), -1)
+
+
+def solve(walls, masses, solar_flux, latitude, month_Solar_declination, ex_t_average, target=0, **parameters):
+    """Maximum g-value, maximum WWR, minimum overhang depth and minimum opening type of every mass that meet the
+    target band, each with the other inputs at the given values. Returns a dict of per-mass arrays keyed by the
+    names of the solved parameters.
+    """
+    solvers = (('g_value', max_g_value), ('WWR', max_wwr), ('overhangs', min_overhang), ('opn_type', min_opn_type))
+    return dict((name, solver(walls, masses, solar_flux, latitude, month_Solar_declination, ex_t_average, target,
+        **dict((key, value) for key, value in parameters.items() if key != name))) for name, solver in solvers)
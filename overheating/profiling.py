@@ -0,0 +1,123 @@
+"""Wall time and call counts of the stages of a solve, in total and per room.
+Used by the Grasshopper components (profile output) to find the stages and the rooms that make a solve slow
+on production models, without attaching an external profiler.
+"""
+#Copyright (c) 2021, Hamidreza Shahriari
+__author__ = "Hamidreza"
+
+import time
+from collections import OrderedDict
+
+# time.perf_counter is not available in IronPython 2.7, whose time.clock is based on the .NET Stopwatch
+# (time.time only changes every 15 ms or so on .NET Framework, too coarse for the per face stages)
+_clock = getattr(time, 'perf_counter', None) or time.clock
+SLOWEST_ROOMS = 10
+
+
+class _Stage(object):
+    # context manager adding its wall time to a stage of the profiler
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = _clock()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, _clock() - self.start)
+        return False
+
+
+class _Room(object):
+    # context manager making its room the current room of the profiler and timing it
+
+    def __init__(self, profiler, room):
+        self.profiler = profiler
+        self.room = room
+
+    def __enter__(self):
+        self.previous = self.profiler.current_room
+        self.profiler.current_room = self.room
+        self.profiler.room_stages.setdefault(self.room, OrderedDict())
+        self.start = _clock()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = _clock() - self.start
+        self.profiler.room_times[self.room] = self.profiler.room_times.get(self.room, 0.0) + seconds
+        self.profiler.current_room = self.previous
+        return False
+
+
+class _Disabled(object):
+    # shared no-op context manager of a disabled profiler
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_DISABLED = _Disabled()
+
+
+class Profiler(object):
+    """Wall time and number of calls of every stage, in total and per room.
+
+    with profiler.room(i):
+        with profiler.stage('mesh'):
+            ...
+
+    A disabled profiler records nothing, so the stages can stay in the code of the components.
+    Stages should not be nested, otherwise their times overlap in the report.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.start = _clock()
+        self.times = OrderedDict()
+        self.calls = OrderedDict()
+        self.room_times = OrderedDict()
+        self.room_stages = OrderedDict()
+        self.current_room = None
+
+    def stage(self, name):
+        if not self.enabled:
+            return _DISABLED
+        return _Stage(self, name)
+
+    def room(self, room):
+        if not self.enabled:
+            return _DISABLED
+        return _Room(self, room)
+
+    def add(self, name, seconds):
+        # add a call of the stage, also to the current room
+        self.times[name] = self.times.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if self.current_room is not None:
+            stages = self.room_stages[self.current_room]
+            stages[name] = stages.get(name, 0.0) + seconds
+
+    def slowest_rooms(self, count=SLOWEST_ROOMS):
+        # (room, seconds) of the slowest rooms, slowest first
+        return sorted(self.room_times.items(), key=lambda item: -item[1])[:count]
+
+    def report(self, count=SLOWEST_ROOMS):
+        """Lines of text with the time and calls of every stage and the stages of the slowest rooms."""
+        if not self.enabled:
+            return []
+        lines = ["Wall time {:.3f} s, {} rooms".format(_clock() - self.start, len(self.room_times))]
+        lines.append("{:<24}{:>10}{:>12}".format("stage", "calls", "time (s)"))
+        for name, seconds in sorted(self.times.items(), key=lambda item: -item[1]):
+            lines.append("{:<24}{:>10}{:>12.4f}".format(name, self.calls[name], seconds))
+        if self.room_times:
+            lines.append("Slowest rooms:")
+            for room, seconds in self.slowest_rooms(count):
+                stages = sorted(self.room_stages[room].items(), key=lambda item: -item[1])
+                lines.append("{}: {:.4f} s ({})".format(room, seconds,
+                    ", ".join("{} {:.4f} s".format(name, t) for name, t in stages)))
+        return lines
@@ -0,0 +1,371 @@
+"""SAP 2012 Appendix P assessment of Honeybee rooms, without Rhino.
+Only honeybee-core, honeybee-energy and ladybug-geometry are used, so the same code runs in the
+Honeybee Grasshopper component (IronPython) and in headless batch runs (CPython).
+"""
+from __future__ import division
+#Copyright (c) 2021, Hamidreza Shahriari
+__author__ = "Hamidreza"
+
+import math
+from array import array
+
+from ladybug_geometry.geometry2d.pointvector import Vector2D
+from ladybug_geometry.geometry3d.pointvector import Vector3D
+from honeybee.facetype import Wall, RoofCeiling, Floor
+from honeybee.boundarycondition import Outdoors
+
+from overheating import sap, tables, breakdown, tojuli
+
+# Inputs of the assessment (the inputs of the Honeybee component without their underscores)
+REQUIRED_INPUTS = ('latitude', 'solar_flux', 'ex_t_average', 'bld_type', 'op_type')
+INPUT_DEFAULTS = {'north': (0, 1), 'solar_access': None, 'z_blinds': None, 'time_fraction': None,
+    'TMP': tables.DEFAULT_TMP, 'FF': tables.DEFAULT_FRAME_FACTOR, 'month': tables.DEFAULT_MONTH, 'region': None}
+# Inputs that may hold one value per month of tables.MONTHS instead of a single value
+MONTHLY_INPUTS = ('solar_flux', 'ex_t_average')
+ALL_MONTHS = tuple(range(len(tables.MONTHS)))
+ALL_REGIONS = tuple(range(len(tables.REGIONS)))
+
+
+class ConstructionTable(object):
+    """U-values and g-values of the constructions of a model, resolved once per construction identifier.
+
+    Faces and apertures refer to their construction by its index in u_values and g_values, so the (computed)
+    properties of a construction shared by thousands of windows are only evaluated once. As the constructions are
+    keyed by identifier, a table is only shared by the rooms of one model (or one solve of a component).
+    """
+
+    def __init__(self):
+        self.indices = {}
+        self.identifiers = []
+        self.u_values = []
+        self.g_values = []
+
+    def __len__(self):
+        return len(self.identifiers)
+
+    def index(self, construction):
+        i = self.indices.get(construction.identifier)
+        if i is None:
+            i = self.indices[construction.identifier] = len(self.identifiers)
+            self.identifiers.append(construction.identifier)
+            self.u_values.append(construction.u_value)
+            # opaque constructions have no g-value
+            self.g_values.append(getattr(construction, 'solar_transmittance', None))
+        return i
+
+
+def region_climate(region):
+    # latitude, and solar flux and mean external temperature of every month, of a SAP climate region
+    return {'latitude': tables.REGION_LATITUDE[region], 'solar_flux': list(tables.REGION_SOLAR_FLUX[region]),
+        'ex_t_average': list(tables.REGION_EX_T[region])}
+
+
+def sap_inputs(**inputs):
+    # Dictionary of the assessment inputs with the defaults filled in and north as a Vector2D.
+    # With a region (index in tables.REGIONS) the latitude, solar flux and external temperature default to its climate.
+    if inputs.get('region') is not None:
+        inputs = dict(inputs)
+        for name, value in region_climate(int(inputs['region'])).items():
+            if inputs.get(name) is None:
+                inputs[name] = value
+    missing = [name for name in REQUIRED_INPUTS if inputs.get(name) is None]
+    if missing:
+        raise ValueError("Missing inputs: {}".format(", ".join(missing)))
+    unknown = [name for name in inputs if name not in REQUIRED_INPUTS and name not in INPUT_DEFAULTS]
+    if unknown:
+        raise ValueError("Unknown inputs: {}".format(", ".join(unknown)))
+    if inputs['bld_type'] not in (0, 1):
+        raise ValueError("Please enter a valid building type (0 or 1) according to the description")
+    result = dict(INPUT_DEFAULTS)
+    result.update((name, value) for name, value in inputs.items() if value is not None)
+    result['month'] = int(result['month'])
+    if not 0 <= result['month'] < len(tables.MONTHS):
+        raise ValueError("Please enter a valid month (0, 1 or 2) according to the description")
+    for name in MONTHLY_INPUTS:
+        if isinstance(result[name], (list, tuple)) and len(result[name]) != len(tables.MONTHS):
+            raise ValueError("{} needs one value per month ({})".format(name, ", ".join(tables.MONTHS)))
+    if not isinstance(result['north'], Vector2D):
+        result['north'] = Vector2D(result['north'][0], result['north'][1])
+    return result
+
+
+def month_value(value, month):
+    # value of a monthly input (see MONTHLY_INPUTS) for the month (index in tables.MONTHS)
+    if isinstance(value, (list, tuple)):
+        return value[month]
+    return value
+
+
+def surface_inclination(surface):
+    # inclination (degrees) of a Honeybee face or aperture
+    return surface.normal.angle(Vector3D(0, 0, 1)) * 180 / math.pi
+
+
+def _extent(points, origin, axis):
+    # lowest and highest position of the points along an axis
+    positions = [(pt - origin).dot(axis) for pt in points]
+    return min(positions), max(positions)
+
+
+def aperture_overhangs(apertures):
+    """Overhang depth (m), depth ratio (depth / window height) and width ratio (depth / window width) of apertures.
+
+    Every outdoor shade of an aperture is projected onto the axes of the aperture: its normal (the depth) and the
+    vertical (up) and horizontal directions in its plane. Shades above the middle of the window that project out of
+    it are overhangs, and the deepest one is the overhang of the aperture. Returns three array('d') columns with a
+    row per aperture, 0 for apertures without an overhang (and for horizontal apertures).
+    """
+    depths, depth_ratios, width_ratios = array('d'), array('d'), array('d')
+    up = Vector3D(0, 0, 1)
+    for ap in apertures:
+        depth = window_height = window_width = 0
+        shades = ap.outdoor_shades
+        normal = ap.normal
+        # vertical direction in the plane of the aperture
+        up_axis = up - normal * up.dot(normal)
+        if shades and up_axis.magnitude > 1e-6:
+            up_axis = up_axis.normalize()
+            origin = ap.vertices[0]
+            bottom, top = _extent(ap.vertices, origin, up_axis)
+            left, right = _extent(ap.vertices, origin, up_axis.cross(normal))
+            window_height, window_width = top - bottom, right - left
+            middle = (bottom + top) / 2
+            for shd in shades:
+                if _extent(shd.vertices, origin, up_axis)[0] >= middle:
+                    depth = max(depth, _extent(shd.vertices, origin, normal)[1])
+        if depth > 0 and window_height > 0 and window_width > 0:
+            depths.append(depth)
+            depth_ratios.append(depth / window_height)
+            width_ratios.append(depth / window_width)
+        else:
+            depths.append(0)
+            depth_ratios.append(0)
+            width_ratios.append(0)
+    return depths, depth_ratios, width_ratios
+
+
+def solar_gain(face, inputs, win_dir, constructions, rows=None):
+    # Solar gain coefficients and heat loss of the apertures of an exterior wall. The coefficients are the conversion
+    # coefficients (A, B, C) of the apertures weighted by their gain per unit of flux on the surface, so the gain of
+    # any month and location follows from them without walking the apertures again (see heat_balance_terms).
+    # With a rows list, a breakdown row of every aperture (for the month input) is appended to it.
+    s_gain = [0, 0, 0]
+    s_loss = 0
+    # shading factor of the apertures without an overhang
+    no_overhang = sap.z_summer_factor(inputs['solar_access'], inputs['z_blinds'], inputs['time_fraction'], 1)
+    depths, depth_ratios, width_ratios = aperture_overhangs(face.apertures)
+    for i, ap in enumerate(face.apertures):
+        construction = constructions.index(ap.properties.energy.construction)
+        dir = ap.cardinal_direction(inputs['north'])
+        # Here we record the directions that operable windows are facing.
+        # (Later we use this dictonary to check if the zone is single sided ventelated or double sided)
+        if ap.is_operable:
+            win_dir[dir] = 1
+        key = sap.cardinal_key(dir)
+        srf_incl = surface_inclination(ap)
+        if depths[i]:
+            shade_factor = sap.z_summer_factor(inputs['solar_access'], inputs['z_blinds'], inputs['time_fraction'],
+                sap.overhang_ratio_factor(key, depth_ratios[i], width_ratios[i]))
+        else:
+            shade_factor = no_overhang
+        ap_loss = sap.fabric_loss(ap.area, constructions.u_values[construction])
+        s_loss += ap_loss
+        weight = sap.opening_gain(ap.area, inputs['FF'], 1, shade_factor, constructions.g_values[construction])
+        for i, coefficient in enumerate(sap.conversion_coefficients(key, srf_incl)):
+            s_gain[i] += weight * coefficient
+        if rows is not None:
+            s_flux = sap.solar_flux(month_value(inputs['solar_flux'], inputs['month']), key, srf_incl, inputs['latitude'],
+                tables.SOLAR_DECLINATION[inputs['month']])
+            rows.append(breakdown.window_row(key, ap.area, s_flux, shade_factor, weight * s_flux, ap_loss))
+    return s_gain, s_loss
+
+
+def building_type(bld_type, win_dir):
+    # Building type of SAP table P1 from the storeys (bld_type) and the directions of the operable windows.
+    # -1 when the room has no operable window.
+    if not win_dir:
+        return -1
+    cross_ventilation = len(win_dir) > 1
+    if bld_type == 0:
+        return 0 if cross_ventilation else 1
+    return 2 if cross_ventilation else 3
+
+
+def heat_balance(room, inputs, constructions=None):
+    """Solar gain (W), heat loss (W/K) and floor faces of a Honeybee room for the month input."""
+    gains, loss, floors = monthly_heat_balance(room, inputs, constructions=constructions)
+    return gains[0], loss, floors
+
+
+def monthly_heat_balance(room, inputs, months=None, rows=None, constructions=None):
+    """Solar gain (W) of every month, heat loss (W/K) and floor faces of a Honeybee room, in one traversal.
+
+    months are indices in tables.MONTHS (by default only the month input); the gains are listed in the same order.
+    With a rows list, the breakdown rows of the room are appended to it (see heat_balance_terms).
+    """
+    if months is None:
+        months = (inputs['month'],)
+    coefficients, loss, floors = heat_balance_terms(room, inputs, rows, constructions)
+    gains = [month_value(inputs['solar_flux'], month) * sap.factor_from_coefficients(coefficients, inputs['latitude'],
+        tables.SOLAR_DECLINATION[month]) for month in months]
+    return gains, loss, floors
+
+
+def heat_balance_terms(room, inputs, rows=None, constructions=None):
+    """Solar gain coefficients, heat loss (W/K) and floor faces of a Honeybee room.
+
+    The solar gain (W) for any solar flux on the horizontal, latitude and solar declination is
+    solar_flux * sap.factor_from_coefficients(coefficients, latitude, month_Solar_declination), so months and
+    climate regions are evaluated from a single traversal of the room.
+    With a rows list, the breakdown rows (see overheating.breakdown) of the room are appended to it.
+    constructions is the ConstructionTable of the model of the room (by default one for this room only).
+    """
+    loss = 0
+    gain = [0, 0, 0]
+    floors = []
+    #dictionary to check the direction windows facing for checking single_sided or double_sided vantilation
+    win_dir = {}
+    if constructions is None:
+        constructions = ConstructionTable()
+    for face in room.faces:
+        bc = face.boundary_condition
+        type = face.type
+        if isinstance(type, Wall):
+            if isinstance(bc, Outdoors):
+                u_value = constructions.u_values[constructions.index(face.properties.energy.construction)]
+                wall_loss = sap.fabric_loss(face.area - face.aperture_area, u_value)
+                wall_loss += sap.bridging_loss(face.area)
+                loss += wall_loss
+                if rows is not None:
+                    rows.append(breakdown.wall_row(sap.cardinal_key(face.cardinal_direction(inputs['north'])),
+                        face.area - face.aperture_area, wall_loss))
+                win_gain, win_loss = solar_gain(face, inputs, win_dir, constructions, rows)
+                loss += win_loss
+                gain = [total + coefficient for total, coefficient in zip(gain, win_gain)]
+        # Calculating heat loss from the roof
+        elif isinstance(type, RoofCeiling):
+            if isinstance(bc, Outdoors):
+                u_value = constructions.u_values[constructions.index(face.properties.energy.construction)]
+                roof_loss = sap.fabric_loss(face.area, u_value)
+                roof_loss += sap.bridging_loss(face.area)
+                loss += roof_loss
+                if rows is not None:
+                    rows.append(breakdown.roof_row(face.area, roof_loss))
+        elif isinstance(type, Floor):
+            floors.append(face)
+    blding_type = building_type(inputs['bld_type'], win_dir)
+    # calculating heat loss due ventilation (rooms without operable windows are not ventilated)
+    if blding_type != -1:
+        vent_loss = sap.ventilation_loss(sap.air_change_rate(inputs['op_type'], blding_type), room.volume)
+        loss += vent_loss
+        if rows is not None:
+            rows.append(breakdown.ventilation_row(vent_loss))
+    return gain, loss, floors
+
+
+def assess_room(room, inputs, constructions=None):
+    """Result row of a Honeybee room: identifier, display_name, gain, loss, ratio, threshold and risk.
+
+    constructions is the ConstructionTable shared by the rooms of a model (see heat_balance_terms).
+    """
+    return assess_room_months(room, inputs, (inputs['month'],), constructions)[0]
+
+
+def assess_room_months(room, inputs, months=ALL_MONTHS, constructions=None):
+    """Result rows (see assess_room) of a Honeybee room for every month, with a month column, in one traversal.
+
+    Every month uses its own solar declination, and its own solar flux and external temperature when these
+    inputs hold one value per month.
+    """
+    coefficients, loss, floors = heat_balance_terms(room, inputs, constructions=constructions)
+    return _month_rows(room, inputs, months, coefficients, loss)
+
+
+def _month_rows(room, inputs, months, coefficients, loss):
+    rows = []
+    for month in months:
+        gain = month_value(inputs['solar_flux'], month) * sap.factor_from_coefficients(coefficients,
+            inputs['latitude'], tables.SOLAR_DECLINATION[month])
+        ratio = sap.summer_ratio(gain, loss)
+        threshold = sap.threshold_temperature(inputs['TMP'], ratio, month_value(inputs['ex_t_average'], month))
+        rows.append({'identifier': room.identifier, 'display_name': room.display_name, 'month': tables.MONTHS[month],
+            'gain': gain, 'loss': loss, 'ratio': ratio, 'threshold': threshold,
+            'risk': tables.RISK_LEVELS[sap.risk_band(threshold)]})
+    return rows
+
+
+def tojuli_row(room, coefficients, loss, floors, TMP=None, latitude=tojuli.LATITUDE, solar_flux=tojuli.SOLAR_FLUX,
+        ex_t_average=tojuli.EX_T_AVERAGE, internal_gain=tojuli.INTERNAL_GAIN):
+    # NTA 8800 result row of a room from its heat balance terms (see heat_balance_terms), in the climate of July
+    gain = solar_flux * sap.factor_from_coefficients(coefficients, latitude, tables.SOLAR_DECLINATION[tojuli.MONTH])
+    floor_area = sum(face.area for face in floors)
+    value = tojuli.tojuli(gain, loss, floor_area, TMP, ex_t_average, internal_gain)
+    return {'identifier': room.identifier, 'display_name': room.display_name, 'gain': gain, 'loss': loss,
+        'floor_area': floor_area, 'tojuli': value, 'compliant': tojuli.meets_limit(value)}
+
+
+def assess_room_standards(room, inputs, months=None, constructions=None, **climate):
+    """SAP result rows (see assess_room_months), NTA 8800 TOjuli row and floor faces of a Honeybee room, from one
+    traversal.
+
+    months are indices in tables.MONTHS (by default only the month input). The TOjuli row (identifier,
+    display_name, gain, loss, floor_area, tojuli and compliant) uses the climate of July in De Bilt unless
+    latitude, solar_flux, ex_t_average or internal_gain are given (see overheating.tojuli).
+    """
+    if months is None:
+        months = (inputs['month'],)
+    coefficients, loss, floors = heat_balance_terms(room, inputs, constructions=constructions)
+    return (_month_rows(room, inputs, months, coefficients, loss),
+        tojuli_row(room, coefficients, loss, floors, inputs['TMP'], **climate), floors)
+
+
+def risk_matrix(hb_rooms, inputs, months=ALL_MONTHS):
+    """Risk level of every room (rows) in every month (columns); the rooms are the rooms of one model."""
+    constructions = ConstructionTable()
+    return [[row['risk'] for row in assess_room_months(room, inputs, months, constructions)] for room in hb_rooms]
+
+
+def region_risk_matrix(hb_rooms, inputs, regions=ALL_REGIONS, months=ALL_MONTHS):
+    """Risk level of every room in every SAP climate region and month, as matrix[room][region][month].
+
+    Every room is traversed once; the latitude, solar flux and external temperature inputs are replaced by those of
+    the regions (see tables.REGIONS). The rooms are the rooms of one model.
+    """
+    matrix = []
+    constructions = ConstructionTable()
+    for room in hb_rooms:
+        coefficients, loss, floors = heat_balance_terms(room, inputs, constructions=constructions)
+        room_risks = []
+        for region in regions:
+            climate = region_climate(region)
+            region_risks = []
+            for month in months:
+                gain = climate['solar_flux'][month] * sap.factor_from_coefficients(coefficients, climate['latitude'],
+                    tables.SOLAR_DECLINATION[month])
+                threshold = sap.threshold_temperature(inputs['TMP'], sap.summer_ratio(gain, loss), climate['ex_t_average'][month])
+                region_risks.append(tables.RISK_LEVELS[sap.risk_band(threshold)])
+            room_risks.append(region_risks)
+        matrix.append(room_risks)
+    return matrix
+
+
+def _construction_key(construction, constructions):
+    # identifier and resolved U-value and g-value of a construction, so editing its materials changes the key
+    i = constructions.index(construction)
+    return (construction.identifier, constructions.u_values[i], constructions.g_values[i])
+
+
+def room_hash(room, constructions=None):
+    # fingerprint of the room geometry, boundary conditions, constructions, apertures and shades; constructions is
+    # the ConstructionTable of the solve, so the constructions are resolved once for the hashes and the assessment.
+    # The tuples of ladybug-geometry points are hashed as they are (without rounding every coordinate), so the key
+    # costs a fraction of the assessment it saves.
+    if constructions is None:
+        constructions = ConstructionTable()
+    faces = []
+    for face in room.faces:
+        apertures = tuple((ap.vertices, ap.is_operable, _construction_key(ap.properties.energy.construction,
+            constructions), tuple(shd.vertices for shd in ap.shades)) for ap in face.apertures)
+        faces.append((face.vertices, face.type.name, face.boundary_condition.name,
+            _construction_key(face.properties.energy.construction, constructions), apertures))
+    return hash(tuple(faces))
@@ -0,0 +1,187 @@
+"""Scalar SAP 2012 Appendix P calculation, free of any Rhino or Honeybee geometry.
+The functions take plain numbers (areas, angles, U and g values, ...) so the same code is used by the
+Grasshopper components (IronPython) and by the vectorized `engine` (CPython + NumPy) as its reference.
+"""
+from __future__ import division
+#Copyright (c) 2021, Hamidreza Shahriari
+__author__ = "Hamidreza"
+
+import math
+from bisect import bisect_left, bisect_right
+
+from overheating import tables
+
+
+def orientation_key(vector_angle):
+    # Orientation code from the angle (degrees) between the surface normal and North
+    return min(int(vector_angle // 36), tables.SOUTH)
+
+
+def cardinal_key(cardinal_direction):
+    # Orientation code from a Honeybee cardinal direction ('North', 'NorthEast', ...)
+    return tables.CARDINAL_TO_ORIENTATION[cardinal_direction]
+
+
+# Memoized conversion factors keyed by (key, srf_incl, latitude, month_Solar_declination)
+_RH_CACHE = {}
+# Memoized conversion coefficients keyed by (key, srf_incl)
+_COEFFICIENT_CACHE = {}
+RH_CACHE_SIZE = 65536
+
+
+def _conversion_coefficients(key, srf_incl):
+    k = tables.K_VALUES[key]
+    # SAP equation U3: polynomials of sin(p/2), p being the inclination of the surface
+    sin_half = math.sin(math.radians(srf_incl / 2))
+    A = k[0] * sin_half ** 3 + k[1] * sin_half ** 2 + k[2] * sin_half
+    B = k[3] * sin_half ** 3 + k[4] * sin_half ** 2 + k[5] * sin_half
+    C = k[6] * sin_half ** 3 + k[7] * sin_half ** 2 + k[8] * sin_half + 1
+    return A, B, C
+
+
+def conversion_coefficients(key, srf_incl):
+    # A, B and C of the conversion factor Rh = A cos(latitude - declination)^2 + B cos(latitude - declination) + C.
+    # They only depend on the orientation and the inclination, so they are memoized like the conversion factors.
+    args = (key, srf_incl)
+    coefficients = _COEFFICIENT_CACHE.get(args)
+    if coefficients is None:
+        if len(_COEFFICIENT_CACHE) >= RH_CACHE_SIZE:
+            _COEFFICIENT_CACHE.clear()
+        coefficients = _COEFFICIENT_CACHE[args] = _conversion_coefficients(key, srf_incl)
+    return coefficients
+
+
+def factor_from_coefficients(coefficients, latitude, month_Solar_declination):
+    # Conversion factor from the conversion coefficients (A, B, C). As the factor is linear in A, B and C, the
+    # coefficients can also be weighted sums over many surfaces.
+    A, B, C = coefficients
+    cos_delta = math.cos(math.radians(latitude - month_Solar_declination))
+    return A * cos_delta ** 2 + B * cos_delta + C
+
+
+def _conversion_factor(key, srf_incl, latitude, month_Solar_declination):
+    return factor_from_coefficients(_conversion_coefficients(key, srf_incl), latitude, month_Solar_declination)
+
+
+def conversion_factor(key, srf_incl, latitude, month_Solar_declination):
+    # Conversion factor (Rh) of the horizontal solar flux to a surface with the given orientation and inclination.
+    # The same few orientations, inclinations and months come back for every aperture, so the results are memoized.
+    args = (key, srf_incl, latitude, month_Solar_declination)
+    rh = _RH_CACHE.get(args)
+    if rh is None:
+        if len(_RH_CACHE) >= RH_CACHE_SIZE:
+            _RH_CACHE.clear()
+        rh = _RH_CACHE[args] = _conversion_factor(*args)
+    return rh
+
+
+def solar_flux(s_flux, key, srf_incl, latitude, month_Solar_declination):
+    # Solar flux on the surface
+    return s_flux * conversion_factor(key, srf_incl, latitude, month_Solar_declination)
+
+
+def solar_access_factor(solar_acces):
+    # Percentage of the sky blocked by obstacles to the solar access factor of SAP table P2
+    if not solar_acces:
+        solar_acces = 0
+    return tables.SOLAR_ACCESS_FACTORS[bisect_left(tables.SOLAR_ACCESS_BINS, solar_acces)]
+
+
+def blind_factor(z_blinds, time_fraction):
+    # Shading factor of the blinds, curtains or shutters weighted by the fraction of the daylight hours they are in use
+    if z_blinds is None or z_blinds < 0:
+        return 1
+    if not time_fraction:
+        time_fraction = 1
+    return time_fraction * tables.BLIND_FACTORS[int(z_blinds)] + (1 - time_fraction)
+
+
+def depth_bin(d_factor):
+    # Depth ratio of the overhang to the column of SAP table P4
+    return bisect_right(tables.DEPTH_BINS, d_factor)
+
+
+def overhang_ratio_factor(key, depth_ratio, width_ratio):
+    # Shading factor of an overhang from the ratios of its depth to the window height and width (SAP table P4)
+    if not depth_ratio:
+        return 1
+    if width_ratio < tables.OVERHANG_WIDTH_RATIO:
+        return tables.OVERHANG_NARROW[key][depth_bin(depth_ratio)]
+    return tables.OVERHANG_WIDE[key][depth_bin(depth_ratio)]
+
+
+def overhang_factor(key, overhang, window_height, window_width):
+    # Shading factor of an overhang of the given depth above a window (SAP table P4)
+    if not overhang:
+        return 1
+    return overhang_ratio_factor(key, overhang / window_height, overhang / window_width)
+
+
+def z_summer(key, solar_acces, z_blinds=None, time_fraction=None, overhang=None, window_height=None, window_width=None):
+    # Summer solar shading factor (Z) combining solar access, overhangs and blinds
+    overhang_result = overhang_factor(key, overhang, window_height, window_width)
+    return z_summer_factor(solar_acces, z_blinds, time_fraction, overhang_result)
+
+
+def z_summer_factor(solar_acces, z_blinds, time_fraction, overhang_result):
+    # Summer solar shading factor (Z) from the overhang factor of the window
+    access = solar_access_factor(solar_acces)
+    return float(blind_factor(z_blinds, time_fraction) * (access + overhang_result - 1))
+
+
+def opening_gain(area, FF, s_flux, shade_factor, g_value):
+    # Solar gain through a glazed opening
+    return tables.SOLAR_INCIDENCE * area * FF * s_flux * shade_factor * g_value
+
+
+def fabric_loss(area, u_value):
+    # Heat loss through an exposed element
+    return area * u_value
+
+
+def bridging_loss(area):
+    # Thermal bridging allowance of an exposed wall or roof (gross area including its openings)
+    return tables.THERMAL_BRIDGING * area
+
+
+def air_change_rate(op_type, bld_type):
+    # calculating air change rate according to the guide lines in SAP 2012 Appendix P
+    if bld_type == -1:
+        return float(0.01)
+    if op_type not in range(4) or bld_type not in range(4):
+        raise ValueError("Please enter the building type and opening type according to the guide line")
+    return float(tables.AIR_CHANGE_RATES[op_type][bld_type])
+
+
+def ventilation_loss(n, volume):
+    # Heat loss due to ventilation
+    return tables.AIR_HEAT_CAPACITY * n * volume
+
+
+def summer_ratio(gain, loss):
+    # Ratio of the solar gain to the heat loss; 0 for rooms without any heat loss (as in engine.assess)
+    if loss <= 0:
+        return 0
+    return gain / loss
+
+
+def threshold_temperature(TMP, Summer_ratio, ex_t_average):
+    # Obtaining the threshold internal temperature which is used to estimate likelihood of high internal temperature.
+    if TMP is None:
+        TMP = tables.DEFAULT_TMP
+    if TMP < tables.TMP_LIMIT:
+        delta_t_mass = 2.0 - 0.007 * TMP
+    else:
+        delta_t_mass = 0
+    return ex_t_average + Summer_ratio + delta_t_mass
+
+
+def risk_band(temp_thresh):
+    # Index of the likelihood of high internal temperature in tables.RISK_LEVELS
+    return bisect_right(tables.RISK_BINS, temp_thresh)
+
+
+def temprature_threshold(TMP, Summer_ratio, ex_t_average):
+    # Likelihood of high internal temperature and its preview colour (r, g, b)
+    band = risk_band(threshold_temperature(TMP, Summer_ratio, ex_t_average))
+    return tables.RISK_LEVELS[band], tables.RISK_COLORS[band]
@@ -0,0 +1,293 @@
+"""Warm local calculation service: the SAP Appendix P assessment of Honeybee rooms over HTTP/JSON.
+
+    python -m overheating.service --port 8765 -j 4
+    python -m overheating.service --unix /tmp/overheating.sock
+
+Honeybee, honeybee-energy and the SAP tables are loaded once by the service and its worker processes, so designers
+and CI jobs share one warm engine instead of paying the start up and import costs on every run. Requests are
+served concurrently with asyncio and the result rows are streamed back as JSON lines while the rooms are assessed.
+
+    GET  /health   {"status": "ok", "requests": n}
+    POST /rooms    {"inputs": {...}, "rooms": [room dicts], "properties": {model properties}, "units": "Meters",
+                    "months": [0, 1, 2]}
+    POST /model    {"inputs": {...}, "model": {HBJSON model}, "months": [0, 1, 2]}
+                   {"inputs": {...}, "path": "local HBJSON file", "months": [0, 1, 2]}
+
+inputs are the inputs of overheating.rooms.sap_inputs. properties and units (the "properties" and "units" of the
+model the abridged room dicts come from) and months (indices in tables.MONTHS, one row per room and month) are
+optional. Every result row
+is one line of the response (see overheating.rooms.assess_room); a failure while streaming is reported as a last
+line {"error": message}.
+"""
+#Copyright (c) 2021, Hamidreza Shahriari
+__author__ = "Hamidreza"
+
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import json
+import multiprocessing
+import sys
+import uuid
+
+from overheating import rooms, hbjson, cache
+
+DEFAULT_PORT = 8765
+# Rooms sent to a worker at once, and chunks in flight per worker
+CHUNK_ROOMS = 64
+CHUNKS_PER_WORKER = 2
+MAX_BODY = 1 << 30
+
+_STATUS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large'}
+# energy properties, units factor and constructions of the requests seen by a worker process, keyed by request
+_ENERGY = cache.LRUCache(8)
+# model members (units and properties) of the requests in flight, keyed by request and shared by the service with
+# its workers (see Service), so they are sent to a worker once per request instead of with every chunk of rooms
+_MODELS = {}
+
+
+class RequestError(Exception):
+    """Invalid request, answered with a 4xx status."""
+
+    def __init__(self, message, status=400):
+        Exception.__init__(self, message)
+        self.status = status
+
+
+def _init_worker(models):
+    # initializer of the worker processes (or thread): the shared mapping of the model members of the requests
+    global _MODELS
+    _MODELS = models
+
+
+def _assess_chunk(request_id, room_dicts, inputs, months):
+    # Result rows of a chunk of room dicts (run in the worker processes)
+    model = _ENERGY.get(request_id)
+    if model is None:
+        members = _MODELS[request_id]
+        energy = hbjson._load_energy(members) if members.get('properties') else None
+        model = (energy, hbjson.units_factor(members), rooms.ConstructionTable())
+        _ENERGY.put(request_id, model)
+    energy, factor, constructions = model
+    inputs = rooms.sap_inputs(**inputs)
+    rows = []
+    for room_dict in room_dicts:
+        room = hbjson._room(room_dict, energy, factor)
+        if months is None:
+            rows.append(rooms.assess_room(room, inputs, constructions))
+        else:
+            rows.extend(rooms.assess_room_months(room, inputs, months, constructions))
+    return rows
+
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Service(object):
+    """Assessment service; workers is the number of worker processes (0 assesses the rooms in a thread)."""
+
+    def __init__(self, workers=None):
+        self.manager = None
+        if workers == 0:
+            self.models = {}
+            self.executor = concurrent.futures.ThreadPoolExecutor(1, initializer=_init_worker,
+                initargs=(self.models,))
+            workers = 1
+        else:
+            self.manager = multiprocessing.Manager()
+            self.models = self.manager.dict()
+            self.executor = concurrent.futures.ProcessPoolExecutor(workers, initializer=_init_worker,
+                initargs=(self.models,))
+            workers = self.executor._max_workers
+        self.in_flight = workers * CHUNKS_PER_WORKER
+        self.requests = 0
+
+    def close(self):
+        self.executor.shutdown()
+        if self.manager is not None:
+            self.manager.shutdown()
+
+    async def handle(self, reader, writer):
+        # one request per connection
+        try:
+            try:
+                method, path, body = await self._read_request(reader)
+                self.requests += 1
+                if path == '/health':
+                    if method != 'GET':
+                        raise RequestError("Use GET for {}".format(path), 405)
+                    await self._send(writer, 200, {'status': 'ok', 'requests': self.requests})
+                    return
+                if path not in ('/rooms', '/model'):
+                    raise RequestError("Unknown path {}".format(path), 404)
+                if method != 'POST':
+                    raise RequestError("Use POST for {}".format(path), 405)
+                # parsing the body and scanning a model file would block the other requests: run them in a thread
+                loop = asyncio.get_running_loop()
+                request = await loop.run_in_executor(None, self._parse, body)
+                members, room_dicts = await loop.run_in_executor(None, self._rooms, path, request)
+            except RequestError as error:
+                await self._send(writer, error.status, {'error': str(error)})
+                return
+            await self._stream(writer, request, members, room_dicts)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        try:
+            request_line = (await reader.readline()).decode('latin1').split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode('latin1').strip()
+                if not line:
+                    break
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+        except ValueError:
+            raise RequestError("Invalid request headers")
+        if len(request_line) != 3:
+            raise RequestError("Invalid request line")
+        try:
+            length = int(headers.get('content-length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            raise RequestError("Invalid Content-Length")
+        if length > MAX_BODY:
+            raise RequestError("Request body larger than {} bytes".format(MAX_BODY), 413)
+        try:
+            body = await reader.readexactly(length) if length else b''
+        except asyncio.IncompleteReadError:
+            raise RequestError("Request body shorter than its Content-Length")
+        return request_line[0].upper(), request_line[1].split('?')[0], body
+
+    def _parse(self, body):
+        try:
+            request = json.loads(body.decode('utf-8'))
+        except ValueError as error:
+            raise RequestError("Invalid JSON: {}".format(error))
+        if not isinstance(request, dict) or not isinstance(request.get('inputs'), dict):
+            raise RequestError("The request needs an inputs object")
+        try:
+            rooms.sap_inputs(**request['inputs'])
+        except ValueError as error:
+            raise RequestError(str(error))
+        months = request.get('months')
+        if months is not None and (not isinstance(months, list) or any(m not in rooms.ALL_MONTHS for m in months)):
+            raise RequestError("months must be a list of month indices {}".format(list(rooms.ALL_MONTHS)))
+        return request
+
+    def _rooms(self, path, request):
+        # model members (units and properties) and room dicts of a request
+        if path == '/rooms':
+            if not isinstance(request.get('rooms'), list):
+                raise RequestError("The request needs a rooms list")
+            members, room_dicts = request, request['rooms']
+        elif 'model' in request:
+            model = request['model']
+            if not isinstance(model, dict):
+                raise RequestError("model must be an HBJSON model object")
+            members, room_dicts = model, model.get('rooms') or []
+        elif 'path' not in request:
+            raise RequestError("The request needs a model or a path")
+        else:
+            try:
+                members = hbjson.model_properties(request['path'])
+            except (OSError, ValueError) as error:
+                raise RequestError("Can not read {}: {}".format(request['path'], error))
+            room_dicts = (room for key, room in hbjson.iter_members(request['path'], keys=()) if key == 'rooms')
+        members = dict((key, members[key]) for key in hbjson.MODEL_KEYS if members.get(key) is not None)
+        try:
+            hbjson.units_factor(members)
+        except ValueError as error:
+            raise RequestError(str(error))
+        return members, room_dicts
+
+    async def _send(self, writer, status, result):
+        body = json.dumps(result).encode('utf-8')
+        writer.write("HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\nConnection: close\r\n\r\n"
+            .format(status, _STATUS[status], len(body)).encode('latin1') + body)
+        await writer.drain()
+
+    async def _stream(self, writer, request, members, room_dicts):
+        # chunks of rooms are assessed by the workers, at most in_flight at a time, and their rows written in order
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n"
+            b"Connection: close\r\n\r\n")
+        loop = asyncio.get_running_loop()
+        request_id = uuid.uuid4().hex
+        pending = collections.deque()
+        chunks = _chunks(room_dicts, CHUNK_ROOMS)
+        try:
+            # the model members are fetched once by every worker that assesses rooms of the request
+            await loop.run_in_executor(None, self.models.__setitem__, request_id, members)
+            while True:
+                while len(pending) < self.in_flight:
+                    # the rooms of a model file are parsed while they are read: read them in a thread
+                    chunk = await loop.run_in_executor(None, next, chunks, None)
+                    if chunk is None:
+                        break
+                    pending.append(loop.run_in_executor(self.executor, _assess_chunk, request_id, chunk,
+                        request['inputs'], request.get('months')))
+                if not pending:
+                    break
+                rows = await pending.popleft()
+                await self._write_chunk(writer, ''.join(json.dumps(row) + '\n' for row in rows))
+        except ConnectionError:
+            raise
+        except Exception as error:
+            for future in pending:
+                future.cancel()
+            await self._write_chunk(writer, json.dumps({'error': "{}: {}".format(type(error).__name__, error)}) + '\n')
+        finally:
+            await loop.run_in_executor(None, self.models.pop, request_id, None)
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _write_chunk(self, writer, text):
+        data = text.encode('utf-8')
+        if data:
+            writer.write("{:x}\r\n".format(len(data)).encode('latin1') + data + b"\r\n")
+            await writer.drain()
+
+
+async def serve(service, host='127.0.0.1', port=DEFAULT_PORT, unix=None):
+    """Serve requests on the local host (or on a Unix socket) until cancelled."""
+    if unix:
+        server = await asyncio.start_unix_server(service.handle, unix, limit=MAX_BODY)
+    else:
+        server = await asyncio.start_server(service.handle, host, port, limit=MAX_BODY)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m overheating.service', description=__doc__.split('\n')[0])
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: localhost only)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', default=None, help='Listen on this Unix socket instead of TCP')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+        help='Number of worker processes (default: all cores, 0: assess in a thread of the service)')
+    args = parser.parse_args(argv)
+    service = Service(args.workers)
+    sys.stderr.write("Serving on {}\n".format(args.unix or "http://{}:{}".format(args.host, args.port)))
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
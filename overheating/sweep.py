@@ -0,0 +1,118 @@
+"""Parametric sweeps of the massing (SAP_Standalone) workflow over envelope and shading inputs (CPython + NumPy).
+The geometry is extracted once into a wall table and a mass table. The per-wall terms that do not depend
+on the swept inputs (area x Rh x solar access) are summed per mass, then broadcast across the Cartesian grid of
+the input values, so every combination is scored with array arithmetic instead of a component re-run.
+"""
+#Copyright (c) 2021, Hamidreza Shahriari
+__author__ = "Hamidreza"
+
+import json
+from collections import OrderedDict
+
+import numpy as np
+
+from overheating import engine, tables
+
+# Inputs that can be swept, in the order of the axes of the results (after the mass axis)
+PARAMETERS = ('g_value', 'WWR', 'U_window', 'U_wall', 'U_roof', 'overhangs', 'curt_blind', 'time_fraction', 'opn_type',
+    'TMP', 'FF')
+PARAMETER_DEFAULTS = {'U_roof': 0.0, 'overhangs': 0.0, 'curt_blind': -1, 'time_fraction': 0.0,
+    'TMP': tables.DEFAULT_TMP, 'FF': tables.DEFAULT_FRAME_FACTOR}
+INT_PARAMETERS = ('curt_blind', 'opn_type')
+
+WALL_DEFAULTS = {'inclination': 90.0, 'window_height': 1.0, 'window_width': 1.0, 'solar_access': 0.0}
+MASS_DEFAULTS = {'roof_area': 0.0, 'bld_type': 0}
+
+
+def wall_table(**columns):
+    """Columnar table of the exposed walls of the masses.
+
+    Required columns are room (row index of the mass), area (exposed wall area in m2, windows included) and
+    orientation (tables.NORTH ... tables.SOUTH); the others fall back to WALL_DEFAULTS.
+    """
+    return engine._table(columns, ('room', 'area', 'orientation'), WALL_DEFAULTS)
+
+
+def mass_table(**columns):
+    """Columnar table of the masses: volume (m3), exposed roof area (m2) and building type of SAP table P1."""
+    table = engine._table(columns, ('volume',), MASS_DEFAULTS)
+    table['bld_type'] = table['bld_type'].astype(int)
+    return table
+
+
+def _on_axes(values, axes, ndim):
+    # array laid out on the given (increasing) axes of the results, with length 1 on every other axis
+    shape = [1] * ndim
+    for axis, size in zip(axes, values.shape):
+        shape[axis] = size
+    return values.reshape(shape)
+
+
+def _gain(solar_flux, shaded_area, WWR, FF, g_value, blind):
+    # solar gain (W) of a mass from the sum of area x Rh x shading of its walls
+    return tables.SOLAR_INCIDENCE * solar_flux * shaded_area * WWR * FF * g_value * blind
+
+
+def _loss(wall_area, roof_area, volume, n, WWR, U_wall, U_window, U_roof):
+    # heat loss (W/K) of a mass: walls, windows, roof, thermal bridging and ventilation
+    return (wall_area * ((1 - WWR) * U_wall + WWR * U_window + tables.THERMAL_BRIDGING)
+        + roof_area * (U_roof + tables.THERMAL_BRIDGING) + tables.AIR_HEAT_CAPACITY * n * volume)
+
+
+def _threshold(gain, loss, TMP, ex_t_average):
+    # threshold temperature; masses without any loss get a ratio of 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(loss > 0, gain / loss, 0.0)
+    return engine.threshold_temperature(TMP, ratio, ex_t_average)
+
+
+def sweep(walls, masses, solar_flux, latitude, month_Solar_declination, ex_t_average, **parameters):
+    """Threshold temperature and risk band of every mass for every combination of the input values.
+
+    Each parameter of PARAMETERS is a scalar or a sequence of values; g_value, WWR, U_window, U_wall and opn_type
+    are required, the others fall back to PARAMETER_DEFAULTS. Returns a dict with the swept values
+    ('parameters', an OrderedDict in axis order), 'threshold' (float32) and 'band' (uint8, index in
+    tables.RISK_LEVELS), both of shape (number of masses,) + the lengths of the parameter values.
+    """
+    unknown = [name for name in parameters if name not in PARAMETERS]
+    if unknown:
+        raise ValueError("Unknown parameters: {}".format(", ".join(unknown)))
+    missing = [name for name in PARAMETERS if name not in parameters and name not in PARAMETER_DEFAULTS]
+    if missing:
+        raise ValueError("Missing parameters: {}".format(", ".join(missing)))
+    values = OrderedDict()
+    for name in PARAMETERS:
+        value = parameters.get(name, PARAMETER_DEFAULTS.get(name))
+        values[name] = np.atleast_1d(np.asarray(value, dtype=int if name in INT_PARAMETERS else float))
+    ndim = len(PARAMETERS) + 1
+    axis = dict((name, i + 1) for i, name in enumerate(PARAMETERS))
+    p = dict((name, _on_axes(value, (axis[name],), ndim)) for name, value in values.items())
+    n_masses = len(masses['volume'])
+
+    # per wall terms that do not depend on the swept values, summed per mass for every overhang depth
+    overhang = engine.overhang_factor(walls['orientation'][:, None], values['overhangs'][None, :],
+        walls['window_height'][:, None], walls['window_width'][:, None])
+    access = engine.solar_access_factor(walls['solar_access'])[:, None]
+    rh_area = (walls['area'] * engine.conversion_factor(walls['orientation'], walls['inclination'], latitude,
+        month_Solar_declination))[:, None]
+    shaded_area = np.stack([np.bincount(walls['room'], weights=column, minlength=n_masses)
+        for column in (rh_area * (access + overhang - 1)).T], axis=1)
+    wall_area = np.bincount(walls['room'], weights=walls['area'], minlength=n_masses)
+
+    blind = engine.blind_factor(values['curt_blind'][:, None], values['time_fraction'][None, :])
+    gain = _gain(solar_flux, _on_axes(shaded_area, (0, axis['overhangs']), ndim), p['WWR'], p['FF'], p['g_value'],
+        _on_axes(blind, (axis['curt_blind'], axis['time_fraction']), ndim))
+
+    n = engine.air_change_rate(values['opn_type'][None, :], masses['bld_type'][:, None])
+    loss = _loss(_on_axes(wall_area, (0,), ndim), _on_axes(masses['roof_area'], (0,), ndim),
+        _on_axes(masses['volume'], (0,), ndim), _on_axes(n, (0, axis['opn_type']), ndim), p['WWR'], p['U_wall'],
+        p['U_window'], p['U_roof'])
+    threshold = _threshold(gain, loss, p['TMP'], ex_t_average)
+    return {'parameters': values, 'threshold': threshold.astype(np.float32),
+        'band': engine.risk_band(threshold).astype(np.uint8)}
+
+
+def from_json(text):
+    # wall and mass tables from the model output of the SAP_Standalone component
+    model = json.loads(text)
+    return wall_table(**model['walls']), mass_table(**model['masses'])
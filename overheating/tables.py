@@ -0,0 +1,103 @@
+"""Lookup tables of SAP 2012 Appendix P: Assessment of internal temperature in summer.
+Every table is indexed by small integer codes so that the scalar functions in `sap` and the
+vectorized functions in `engine` read exactly the same numbers.
+"""
+#Copyright (c) 2021, Hamidreza Shahriari
+__author__ = "Hamidreza"
+
+
+# Orientation keys used by the SAP tables. West facing surfaces use the East (NW -> NE, SW -> SE) values.
+ORIENTATIONS = ['North', 'NE', 'East', 'SE', 'South']
+NORTH, NE, EAST, SE, SOUTH = range(5)
+
+# Honeybee cardinal directions mapped onto the SAP orientation keys
+CARDINAL_TO_ORIENTATION = {'North': NORTH, 'NorthEast': NE, 'NorthWest': NE, 'East': EAST, 'West': EAST,
+    'SouthEast': SE, 'SouthWest': SE, 'South': SOUTH}
+
+# k-values (k1 ... k9) of SAP table U5 for the conversion of the horizontal flux to an inclined surface
+K_VALUES = [
+    [26.3, -38.5, 14.8, -16.5, 27.3, -11.9, -1.06, 0.0872, -0.191],  # North
+    [0.165, -3.68, 3.0, 6.38, -4.53, -0.405, -4.38, 4.89, -1.99],    # NE
+    [1.44, -2.36, 1.07, -0.514, 1.89, -1.64, -0.542, -0.757, 0.604], # East
+    [-2.95, 2.89, 1.17, 5.67, -3.54, -4.28, -2.72, -0.25, 3.07],     # SE
+    [-0.66, -0.106, 2.93, 3.63, -0.374, -7.4, -2.71, -0.991, 4.59]]  # South
+
+# Solar declination of the summer months {June : 0, July : 1, August : 2}
+MONTHS = ['June', 'July', 'August']
+SOLAR_DECLINATION = [23.1, 21.2, 13.7]
+DEFAULT_MONTH = 1
+
+# Climate regions of SAP 2012 Appendix U with their latitude (table U4), and the solar flux on the horizontal
+# (W/m2, table U3) and the mean external temperature (C, table U1) of June, July and August.
+# The UK average is the climate of East Pennines (Sheffield), so the two rows are the same.
+REGIONS = ['UK average', 'Thames', 'South East England', 'Southern England', 'South West England', 'Severn',
+    'Midlands', 'West Pennines', 'North West England / South West Scotland', 'Borders', 'North East England',
+    'East Pennines', 'East Anglia', 'Wales', 'West Scotland', 'East Scotland', 'North East Scotland', 'Highland',
+    'Western Isles', 'Orkney', 'Shetland', 'Northern Ireland']
+REGION_LATITUDE = [53.5, 51.5, 51.0, 50.8, 50.6, 51.5, 52.7, 53.4, 54.8, 55.5, 54.5, 53.5, 52.3, 52.5, 55.9, 56.2,
+    57.3, 57.5, 58.0, 59.0, 60.2, 54.6]
+REGION_SOLAR_FLUX = [
+    [200, 189, 157], [217, 203, 173], [231, 216, 182], [235, 217, 185], [233, 204, 182], [226, 206, 175],
+    [208, 194, 163], [203, 186, 152], [203, 194, 156], [196, 187, 153], [198, 190, 156], [200, 189, 157],
+    [220, 206, 173], [220, 199, 167], [193, 185, 150], [191, 183, 150], [188, 177, 144], [185, 170, 139],
+    [206, 185, 149], [201, 178, 145], [208, 181, 144], [198, 183, 150]]
+REGION_EX_T = [
+    [14.6, 16.6, 16.4], [16.0, 17.9, 17.8], [15.4, 17.4, 17.5], [15.4, 17.3, 17.3], [14.5, 16.2, 16.3],
+    [15.0, 16.7, 16.7], [14.8, 16.6, 16.5], [14.7, 16.4, 16.3], [13.2, 14.9, 14.8], [13.3, 15.2, 15.1],
+    [13.8, 15.8, 15.6], [14.6, 16.6, 16.4], [15.4, 17.6, 17.6], [13.7, 15.3, 15.3], [13.0, 14.5, 14.4],
+    [12.9, 14.6, 14.5], [12.2, 14.0, 13.9], [11.4, 13.2, 13.1], [11.8, 13.4, 13.6], [11.2, 13.1, 13.2],
+    [10.5, 12.4, 12.8], [13.5, 15.0, 14.9]]
+
+# Shading factors for blinds, curtains or external shutters according to SAP table P3
+BLIND_FACTORS = [0.8, 0.9, 0.85, 0.6, 0.88, 0.7, 0.27, 0.24, 0.85, 0.65]
+
+# Solar access factors (SAP table P2): lower bound of the blocked sky percentage and its factor
+SOLAR_ACCESS_BINS = [20, 60, 80]
+SOLAR_ACCESS_FACTORS = [1, 0.9, 0.7, 0.5]
+
+# Overhang depth ratio bins (SAP table P4): 'zr', 'two', 'four', 'six', 'eight', 'ten', 'twlv'
+DEPTH_BINS = [0.1, 0.3, 0.5, 0.7, 0.9, 1.1]
+
+# Overhang shading factors (SAP table P4) [orientation][depth bin], for overhang width ratios below 2
+OVERHANG_NARROW = [
+    [1, 0.94, 0.9, 0.88, 0.86, 0.85, 0.84],   # North
+    [1, 0.91, 0.85, 0.81, 0.79, 0.77, 0.76],  # NE
+    [1, 0.89, 0.79, 0.72, 0.66, 0.61, 0.57],  # East
+    [1, 0.84, 0.72, 0.62, 0.55, 0.52, 0.5],   # SE
+    [1, 0.79, 0.64, 0.53, 0.5, 0.49, 0.48]]   # South
+
+# Overhang shading factors (SAP table P4) [orientation][depth bin], for overhang width ratios of 2 and more
+OVERHANG_WIDE = [
+    [1, 0.92, 0.85, 0.79, 0.73, 0.69, 0.66],  # North
+    [1, 0.89, 0.8, 0.72, 0.65, 0.59, 0.55],   # NE
+    [1, 0.88, 0.76, 0.66, 0.58, 0.51, 0.46],  # East
+    [1, 0.83, 0.67, 0.54, 0.43, 0.36, 0.31],  # SE
+    [1, 0.79, 0.55, 0.38, 0.32, 0.3, 0.29]]   # South
+OVERHANG_WIDTH_RATIO = 2
+
+# Air change rates of SAP table P1 [opening type][building type]
+# opening type: {"Trickle vents only" = 0 , "Windows slightly open (50 mm)" = 1, "Windows open half the time" = 2,"Windows fully open" = 3}
+# building type: {"single storey, cross ventilation possible" = 0, "single storey, cross ventilation not possible" = 1,
+#                 "two or more storeys, cross ventilation possible" = 2, "two or more storeys, cross ventilation not possible" = 3}
+AIR_CHANGE_RATES = [
+    [0.1, 0.1, 0.2, 0.1],
+    [0.8, 0.5, 1, 0.6],
+    [3, 2, 4, 2.5],
+    [6, 4, 8, 5]]
+
+# Thermal mass parameter above which the thermal mass adds nothing to the threshold temperature
+TMP_LIMIT = 285
+DEFAULT_TMP = 220
+
+# Likelihood of high internal temperature (SAP table P5): upper bound of the threshold temperature of each band
+RISK_BINS = [20.5, 22, 23.5]
+RISK_LEVELS = ['Not significant', 'Slight', 'Medium', 'High']
+RISK_COLORS = [(3, 166, 90), (242, 191, 39), (217, 121, 4), (191, 4, 4)]
+
+# Thermal bridging allowance (W/m2K) added to every exposed wall and roof area
+THERMAL_BRIDGING = 0.15
+# Factor for non-perpendicular solar incidence on the glazing
+SOLAR_INCIDENCE = 0.9
+# Volumetric heat capacity of the air (Wh/m3K) used for the ventilation heat loss
+AIR_HEAT_CAPACITY = 0.33
+DEFAULT_FRAME_FACTOR = 0.7
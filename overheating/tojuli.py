@@ -0,0 +1,64 @@
+"""NTA 8800 TOjuli indicator: the temperature exceedance in July (K) of a zone without active cooling.
+TOjuli is the cooling need of July (monthly method of NTA 8800 / ISO 13790) divided by the heat transfer of the
+zone and the hours of July. It is computed from the same solar gain and heat loss as the SAP assessment, so the
+Honeybee rooms are traversed once for both methods (see overheating.rooms.assess_room_standards).
+"""
+from __future__ import division
+#Copyright (c) 2021, Hamidreza Shahriari
+__author__ = "Hamidreza"
+
+# July (index in tables.MONTHS) and its climate in De Bilt: latitude, mean solar flux on the horizontal (W/m2) and
+# mean external temperature (C)
+MONTH = 1
+LATITUDE = 52.1
+SOLAR_FLUX = 212
+EX_T_AVERAGE = 17.9
+# Cooling set point (C) of the monthly method
+SETPOINT = 24.0
+# Internal heat gain of dwellings (W per m2 of floor area)
+INTERNAL_GAIN = 2.2
+# Numerical parameter a0 and reference time constant tau0 (h) of the loss utilisation factor
+A_0 = 1.0
+TAU_0 = 15.0
+# Thermal mass parameter (kJ/m2K of floor area) used for the time constant when none is given
+DEFAULT_TMP = 220
+# Upper limit (K) of TOjuli for dwellings without active cooling
+LIMIT = 1.2
+
+
+def time_constant(TMP, floor_area, loss):
+    # Time constant (h) of the zone from its thermal mass parameter, floor area and heat transfer (W/K)
+    if TMP is None:
+        TMP = DEFAULT_TMP
+    if loss <= 0:
+        return 0
+    return TMP * floor_area / 3.6 / loss
+
+
+def loss_utilisation(gain_ratio, tau):
+    # Utilisation factor of the heat loss for cooling; gain_ratio is the heat gain over the heat loss of the month
+    if gain_ratio <= 0:
+        return 1
+    a = A_0 + tau / TAU_0
+    loss_ratio = 1 / gain_ratio
+    if loss_ratio == 1:
+        return a / (a + 1)
+    return (1 - loss_ratio ** a) / (1 - loss_ratio ** (a + 1))
+
+
+def tojuli(solar_gain, loss, floor_area, TMP=None, ex_t_average=EX_T_AVERAGE, internal_gain=INTERNAL_GAIN):
+    """TOjuli (K) of a zone from its mean solar gain in July (W), heat transfer (W/K) and floor area (m2)."""
+    if loss <= 0:
+        return 0
+    # heat gain and heat loss of July per unit of heat transfer and hour (K)
+    gain = (solar_gain + internal_gain * floor_area) / loss
+    delta_t = SETPOINT - ex_t_average
+    if delta_t <= 0:
+        return gain - delta_t
+    utilisation = loss_utilisation(gain / delta_t, time_constant(TMP, floor_area, loss))
+    return max(gain - utilisation * delta_t, 0)
+
+
+def meets_limit(value):
+    # TOjuli within the limit for dwellings without active cooling
+    return value <= LIMIT
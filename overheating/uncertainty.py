@@ -0,0 +1,138 @@
+"""Monte Carlo assessment of the massing (SAP_Standalone) workflow for the inputs that depend on the occupants (CPython + NumPy).
+The blind use (time_fraction), the opening type (opn_type), the blinds (curt_blind) and the solar access are
+sampled from distributions, and every mass gets the probability of each risk band. The geometry of the wall and
+mass tables (see overheating.sweep) is reduced once to a few sums per mass, so a sample only costs a handful of
+array operations.
+"""
+#Copyright (c) 2021, Hamidreza Shahriari
+__author__ = "Hamidreza"
+
+import numpy as np
+
+from overheating import engine, sweep, tables
+
+# Inputs that can be sampled; solar_access replaces the solar_access column of the walls of the mass
+UNCERTAIN = ('time_fraction', 'opn_type', 'curt_blind', 'solar_access')
+INT_UNCERTAIN = ('opn_type', 'curt_blind')
+DISTRIBUTIONS = ('uniform', 'triangular', 'normal', 'choice')
+# Samples x masses evaluated at once
+CHUNK_SIZE = 1 << 22
+
+
+def _distribution(spec):
+    # sampler (rng, shape) -> samples of a distribution given as a value, ('uniform', low, high),
+    # ('triangular', low, mode, high), ('normal', mean, standard deviation) or ('choice', values[, probabilities])
+    if not isinstance(spec, (list, tuple)) or not spec or spec[0] not in DISTRIBUTIONS:
+        value = np.asarray(spec)
+        return lambda rng, shape: np.broadcast_to(value, shape)
+    kind, args = spec[0], list(spec[1:])
+    if kind == 'choice':
+        values = np.asarray(args[0])
+        p = np.asarray(args[1], dtype=float) if len(args) > 1 else None
+        return lambda rng, shape: rng.choice(values, size=shape, p=p)
+    if kind == 'uniform':
+        return lambda rng, shape: rng.uniform(args[0], args[1], shape)
+    if kind == 'triangular':
+        return lambda rng, shape: rng.triangular(args[0], args[1], args[2], shape)
+    return lambda rng, shape: rng.normal(args[0], args[1], shape)
+
+
+def _samples(name, sampler, rng, shape):
+    values = sampler(rng, shape)
+    if name in INT_UNCERTAIN:
+        values = np.asarray(values).astype(int)
+        if name == 'opn_type' and ((values < 0) | (values >= len(tables.AIR_CHANGE_RATES))).any():
+            raise ValueError("opn_type samples must be opening types of SAP table P1 (0 to 3)")
+        if name == 'curt_blind' and ((values < -1) | (values >= len(tables.BLIND_FACTORS))).any():
+            raise ValueError("curt_blind samples must be -1 (no blinds) or blinds of SAP table P3")
+        return values
+    if name == 'time_fraction':
+        return np.clip(values, 0.0, 1.0)
+    return np.clip(values, 0.0, 100.0)
+
+
+def _blind_factor(blinds, time_fraction):
+    # Blinds code -1 means no blinds. Unlike engine.blind_factor a time fraction of 0 is used as it is (blinds never
+    # in use): the time fractions given as parameters are mapped to the deterministic meaning beforehand.
+    return time_fraction * engine.BLIND_FACTORS[blinds] + (1 - time_fraction)
+
+
+def probabilities(walls, masses, solar_flux, latitude, month_Solar_declination, ex_t_average, distributions,
+        samples=100000, seed=None, **parameters):
+    """Probability of every risk band of every mass when the occupant dependent inputs are uncertain.
+
+    distributions maps the names of UNCERTAIN to a value or a distribution: ('uniform', low, high),
+    ('triangular', low, mode, high), ('normal', mean, standard deviation) or ('choice', values, probabilities);
+    time_fraction samples are clipped to 0-1, a sample of 0 meaning blinds never in use (a time_fraction parameter
+    of 0 keeps the meaning of the deterministic calculation: blinds in use all day), and solar_access to 0-100.
+    Inputs that are not given keep the values of parameters and of the wall table. Every mass gets its own samples.
+    parameters are the other inputs of overheating.sweep.sweep, as scalars or one value per mass. Returns a dict
+    with 'probability' (masses x bands, columns in the order of tables.RISK_LEVELS) and the 'mean' and 'std' of the
+    threshold temperature of every mass.
+    """
+    unknown = [name for name in distributions if name not in UNCERTAIN]
+    unknown += [name for name in parameters if name not in sweep.PARAMETERS or name in distributions]
+    if unknown:
+        raise ValueError("Unknown or repeated inputs: {}".format(", ".join(unknown)))
+    missing = [name for name in sweep.PARAMETERS
+        if name not in parameters and name not in sweep.PARAMETER_DEFAULTS and name not in distributions]
+    if missing:
+        raise ValueError("Missing parameters: {}".format(", ".join(missing)))
+    n_masses = len(masses['volume'])
+    p = {}
+    for name in sweep.PARAMETERS:
+        if name not in distributions:
+            value = parameters.get(name, sweep.PARAMETER_DEFAULTS.get(name))
+            value = np.asarray(value, dtype=int if name in sweep.INT_PARAMETERS else float)
+            p[name] = np.broadcast_to(value, (n_masses,))
+    samplers = dict((name, _distribution(spec)) for name, spec in distributions.items())
+    rng = np.random.default_rng(seed)
+
+    # geometry sums: area x Rh of the walls, and their shading without the solar access (or with the wall's own)
+    rh_area = walls['area'] * engine.conversion_factor(walls['orientation'], walls['inclination'], latitude,
+        month_Solar_declination)
+    overhang = engine.overhang_factor(walls['orientation'], p['overhangs'][walls['room']], walls['window_height'],
+        walls['window_width'])
+    sampled_access = 'solar_access' in samplers
+    access = 0.0 if sampled_access else engine.solar_access_factor(walls['solar_access'])
+    rh_sum = np.bincount(walls['room'], weights=rh_area, minlength=n_masses)
+    shaded = np.bincount(walls['room'], weights=rh_area * (access + overhang - 1), minlength=n_masses)
+    wall_area = np.bincount(walls['room'], weights=walls['area'], minlength=n_masses)
+    gain = tables.SOLAR_INCIDENCE * solar_flux * p['WWR'] * p['FF'] * p['g_value']
+    fabric = (wall_area * ((1 - p['WWR']) * p['U_wall'] + p['WWR'] * p['U_window'] + tables.THERMAL_BRIDGING)
+        + masses['roof_area'] * (p['U_roof'] + tables.THERMAL_BRIDGING))
+    TMP = np.asarray(p['TMP'], dtype=float)
+    ex_t = ex_t_average + np.where(TMP < tables.TMP_LIMIT, 2.0 - 0.007 * TMP, 0.0)
+
+    # inputs that are not sampled, on the sample axis
+    values = dict((name, p[name][:, None]) for name in UNCERTAIN if name in p)
+    if 'time_fraction' in values:
+        # a time fraction of 0 (or none given) means blinds in use all day, as in engine.blind_factor
+        values['time_fraction'] = np.where(values['time_fraction'] > 0, values['time_fraction'], 1.0)
+    counts = np.zeros((n_masses, len(tables.RISK_LEVELS)), dtype=np.int64)
+    total = np.zeros(n_masses)
+    total_sq = np.zeros(n_masses)
+    chunk = max(1, CHUNK_SIZE // max(n_masses, 1))
+    done = 0
+    while done < samples:
+        shape = (n_masses, min(chunk, samples - done))
+        for name, sampler in samplers.items():
+            values[name] = _samples(name, sampler, rng, shape)
+        shading = shaded[:, None]
+        if sampled_access:
+            shading = shading + engine.solar_access_factor(values['solar_access']) * rh_sum[:, None]
+        blind = _blind_factor(values['curt_blind'], values['time_fraction'])
+        n = engine.air_change_rate(values['opn_type'], masses['bld_type'][:, None])
+        loss = fabric[:, None] + tables.AIR_HEAT_CAPACITY * n * masses['volume'][:, None]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(loss > 0, gain[:, None] * shading * blind / loss, 0.0)
+        threshold = ex_t[:, None] + ratio
+        # samples at or above every bin of the risk bands
+        above = np.stack([(threshold >= limit).sum(axis=1) for limit in tables.RISK_BINS], axis=1)
+        counts += -np.diff(np.column_stack([np.full(n_masses, shape[1]), above, np.zeros(n_masses, int)]), axis=1)
+        total += threshold.sum(axis=1)
+        total_sq += (threshold ** 2).sum(axis=1)
+        done += shape[1]
+    mean = total / samples
+    return {'probability': counts / samples, 'mean': mean,
+        'std': np.sqrt(np.maximum(total_sq / samples - mean ** 2, 0.0))}
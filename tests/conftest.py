@@ -0,0 +1,26 @@
+"""Shared fixtures: seeded massing tables (see overheating.sweep) and Honeybee models (see benchmarks.synthetic)."""
+import pytest
+
+
+@pytest.fixture
+def make_massing():
+    # factory of seeded wall and mass tables with n_masses masses of walls_per_mass walls each
+    np = pytest.importorskip('numpy')
+    from overheating import sweep, tables
+
+    def make(n_masses=4, walls_per_mass=3, seed=3):
+        rng = np.random.RandomState(seed)
+        n_walls = n_masses * walls_per_mass
+        walls = sweep.wall_table(room=np.repeat(np.arange(n_masses), walls_per_mass),
+            area=rng.uniform(5, 20, n_walls), orientation=rng.randint(0, tables.SOUTH + 1, n_walls),
+            inclination=rng.choice([60, 90], n_walls), window_height=rng.uniform(0.8, 2.4, n_walls),
+            window_width=rng.uniform(0.4, 3, n_walls), solar_access=rng.choice([0, 40, 70, 90], n_walls))
+        masses = sweep.mass_table(volume=rng.uniform(40, 250, n_masses), roof_area=rng.choice([0, 30], n_masses),
+            bld_type=rng.randint(0, 4, n_masses))
+        return walls, masses
+    return make
+
+
+@pytest.fixture
+def massing(make_massing):
+    return make_massing()
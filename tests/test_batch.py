@@ -0,0 +1,82 @@
+"""Resume of interrupted batch runs."""
+import csv
+import io
+import os
+
+import pytest
+
+pytest.importorskip('honeybee_energy')
+
+from honeybee.model import Model
+
+from benchmarks import synthetic
+from overheating import batch
+
+INPUTS = {'latitude': 53.4, 'solar_flux': 175, 'ex_t_average': 16.2, 'bld_type': 1, 'op_type': 2}
+
+
+@pytest.fixture
+def models(tmp_path):
+    # folder of three models of two rooms each
+    folder = tmp_path / 'models'
+    folder.mkdir()
+    for i in range(3):
+        Model('Model_{}'.format(i), synthetic.honeybee_rooms(2, seed=i)).to_hbjson('model_{}'.format(i), str(folder))
+    return batch.model_files(str(folder))
+
+
+def _rows(results):
+    with open(results, newline='', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+def test_resume_skips_completed_models(models, tmp_path):
+    results = str(tmp_path / 'results.csv')
+    assert batch.run(models, INPUTS, results, processes=1) == 6
+    assert batch.run(models, INPUTS, results, processes=1) == 0
+    rows = _rows(results)
+    assert len(rows) == 6
+    assert sorted(set(row['model'] for row in rows)) == [os.path.basename(path) for path in models]
+
+
+def test_resume_redoes_interrupted_model(models, tmp_path):
+    results = str(tmp_path / 'results.csv')
+    batch.run(models, INPUTS, results, processes=1)
+    expected = _rows(results)
+    # interrupt the run after the rows of the last model, with its last row half written and no done log entry
+    with open(batch.done_file(results), encoding='utf-8') as f:
+        lines = f.readlines()
+    last = lines[-1].rstrip('\n')
+    with open(batch.done_file(results), 'w', encoding='utf-8') as f:
+        f.writelines(lines[:-1])
+    with open(results, encoding='utf-8', newline='') as f:
+        text = f.read()
+    with open(results, 'w', encoding='utf-8', newline='') as f:
+        f.write(text[:-10])
+    assert batch.run(models, INPUTS, results, processes=1) == 2
+    rows = _rows(results)
+    assert len(rows) == 6
+    key = lambda row: (row['model'], row['identifier'])
+    assert sorted(rows, key=key) == sorted(expected, key=key)
+    assert sum(1 for row in rows if row['model'] == last) == 2
+
+
+def test_resume_refuses_other_inputs(models, tmp_path):
+    results = str(tmp_path / 'results.csv')
+    batch.run(models[:1], INPUTS, results, processes=1)
+    with pytest.raises(ValueError):
+        batch.run(models, dict(INPUTS, op_type=3), results, processes=1)
+    with pytest.raises(ValueError):
+        batch.run(models, INPUTS, results, processes=1, months=(0, 1, 2))
+    assert batch.run(models, INPUTS, results, processes=1) == 4
+
+
+def test_failed_model_is_retried(models, tmp_path):
+    results = str(tmp_path / 'results.csv')
+    broken = str(tmp_path / 'models' / 'broken.hbjson')
+    with open(broken, 'w') as f:
+        f.write('{"type": "Model", "rooms": [')
+    log = io.StringIO()
+    assert batch.run(models + [broken], INPUTS, results, processes=1, log=log) == 6
+    assert 'broken.hbjson' in log.getvalue()
+    assert 'broken.hbjson' not in batch.completed_models(results)
@@ -0,0 +1,89 @@
+"""engine.assess against the scalar calculation of overheating.sap."""
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from overheating import engine, sap, tables
+
+LATITUDE = 51.5
+SOLAR_FLUX = 190.0
+EX_T_AVERAGE = 16.5
+
+
+def _openings(n_rooms=40, n_openings=200, seed=1):
+    rng = np.random.RandomState(seed)
+    # room 0 has no openings
+    return engine.opening_table(room=rng.randint(1, n_rooms, n_openings), area=rng.uniform(0.5, 6, n_openings),
+        orientation=rng.randint(0, tables.SOUTH + 1, n_openings), inclination=rng.choice([30, 45, 90], n_openings),
+        g_value=rng.uniform(0.3, 0.8, n_openings), frame_factor=rng.uniform(0.6, 0.9, n_openings),
+        u_value=rng.uniform(0.8, 2.8, n_openings), overhang=rng.choice([0, 0.2, 0.6, 1.5], n_openings),
+        window_height=rng.uniform(0.8, 2.4, n_openings), window_width=rng.uniform(0.4, 3, n_openings),
+        blinds=rng.randint(-1, len(tables.BLIND_FACTORS), n_openings), time_fraction=rng.choice([0, 0.5, 1], n_openings),
+        solar_access=rng.choice([0, 40, 70, 90], n_openings))
+
+
+def _rooms(n_rooms=40, seed=2):
+    rng = np.random.RandomState(seed)
+    bld_type = rng.randint(-1, 2, n_rooms)
+    op_type = rng.randint(0, 4, n_rooms)
+    volume = rng.uniform(20, 200, n_rooms)
+    fabric_loss = rng.uniform(5, 60, n_rooms)
+    # room 0 has no loss at all
+    volume[0] = fabric_loss[0] = 0
+    return engine.room_table(volume=volume, fabric_loss=fabric_loss,
+        air_change_rate=[sap.air_change_rate(o, b) for o, b in zip(op_type, bld_type)])
+
+
+def _scalar(openings, rooms, month, TMP):
+    # gain, loss and threshold of every room with the scalar functions of overheating.sap
+    n_rooms = len(rooms['volume'])
+    gain = [0.0] * n_rooms
+    loss = [rooms['fabric_loss'][i] + sap.ventilation_loss(rooms['air_change_rate'][i], rooms['volume'][i])
+        for i in range(n_rooms)]
+    for i in range(len(openings['room'])):
+        o = dict((name, column[i].item()) for name, column in openings.items())
+        key = o['orientation']
+        s_flux = sap.solar_flux(SOLAR_FLUX, key, o['inclination'], LATITUDE, tables.SOLAR_DECLINATION[month])
+        z = sap.z_summer(key, o['solar_access'], o['blinds'], o['time_fraction'], o['overhang'], o['window_height'],
+            o['window_width'])
+        gain[o['room']] += sap.opening_gain(o['area'], o['frame_factor'], s_flux, z, o['g_value'])
+        loss[o['room']] += sap.fabric_loss(o['area'], o['u_value'])
+    threshold = [sap.threshold_temperature(TMP, sap.summer_ratio(g, l), EX_T_AVERAGE) for g, l in zip(gain, loss)]
+    return np.array(gain), np.array(loss), np.array(threshold)
+
+
+@pytest.mark.parametrize('TMP', [100, tables.DEFAULT_TMP, 300])
+def test_assess_matches_scalar(TMP):
+    openings, rooms = _openings(), _rooms()
+    month = tables.DEFAULT_MONTH
+    result = engine.assess(openings, rooms, SOLAR_FLUX, LATITUDE, tables.SOLAR_DECLINATION[month], EX_T_AVERAGE, TMP)
+    gain, loss, threshold = _scalar(openings, rooms, month, TMP)
+    np.testing.assert_allclose(result['gain'], gain, rtol=1e-9)
+    np.testing.assert_allclose(result['loss'], loss, rtol=1e-9)
+    np.testing.assert_allclose(result['threshold'], threshold, rtol=1e-9)
+    assert result['ratio'][0] == 0
+    assert result['band'].tolist() == [sap.risk_band(t) for t in threshold]
+
+
+def test_assess_months_matches_assess():
+    openings, rooms = _openings(), _rooms()
+    months = (0, 1, 2)
+    solar_flux = (180.0, SOLAR_FLUX, 160.0)
+    ex_t = (15.0, EX_T_AVERAGE, 16.0)
+    result = engine.assess_months(openings, rooms, solar_flux, LATITUDE, ex_t, months)
+    for column, month in enumerate(months):
+        single = engine.assess(openings, rooms, solar_flux[column], LATITUDE, tables.SOLAR_DECLINATION[month],
+            ex_t[column])
+        for name in ('gain', 'ratio', 'threshold'):
+            np.testing.assert_allclose(result[name][:, column], single[name], rtol=1e-9)
+        assert result['band'][:, column].tolist() == single['band'].tolist()
+
+
+def test_assess_regions_matches_assess():
+    openings, rooms = _openings(), _rooms()
+    result = engine.assess_regions(openings, rooms)
+    for region in range(len(tables.REGIONS)):
+        for month in range(len(tables.MONTHS)):
+            single = engine.assess(openings, rooms, tables.REGION_SOLAR_FLUX[region][month],
+                tables.REGION_LATITUDE[region], tables.SOLAR_DECLINATION[month], tables.REGION_EX_T[region][month])
+            np.testing.assert_allclose(result['threshold'][:, region, month], single['threshold'], rtol=1e-9)
@@ -0,0 +1,90 @@
+"""Streaming reader of HBJSON files against honeybee Model.from_hbjson."""
+import json
+
+import pytest
+
+pytest.importorskip('honeybee_energy')
+
+from honeybee.model import Model
+from honeybee_energy.construction.window import WindowConstruction
+from honeybee_energy.material.glazing import EnergyWindowMaterialSimpleGlazSys
+
+from benchmarks import synthetic
+from overheating import hbjson, rooms
+
+INPUTS = {'latitude': 51.5, 'solar_flux': [190, 182, 160], 'ex_t_average': [15.4, 17.5, 17.2], 'bld_type': 0,
+    'op_type': 1}
+
+
+def _model(units='Meters'):
+    # seeded model with a custom window construction on some apertures and an orphaned shade
+    hb_rooms = synthetic.honeybee_rooms(6, faces_per_room=7, apertures_per_face=2, seed=4)
+    glazing = WindowConstruction('Solar control glazing', [EnergyWindowMaterialSimpleGlazSys('Glass', 1.1, 0.28)])
+    for room in hb_rooms[::2]:
+        for face in room.faces:
+            for aperture in face.apertures[::2]:
+                aperture.properties.energy.construction = glazing
+    model = Model('Scheme', hb_rooms)
+    model.convert_to_units(units)
+    return model
+
+
+def _write(model, path, properties_last=False):
+    data = model.to_dict()
+    if properties_last:
+        data = dict((key, value) for key, value in data.items() if key not in ('units', 'properties'))
+        data.update(units=model.units, properties=model.to_dict()['properties'])
+    with open(str(path), 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    return str(path)
+
+
+def _expected(path, months=None):
+    model = Model.from_hbjson(path)
+    model.convert_to_units('Meters')
+    inputs = rooms.sap_inputs(**INPUTS)
+    constructions = rooms.ConstructionTable()
+    if months is None:
+        return [rooms.assess_room(room, inputs, constructions) for room in model.rooms]
+    return [row for room in model.rooms for row in rooms.assess_room_months(room, inputs, months, constructions)]
+
+
+def _assert_rows(rows, expected):
+    assert [row['identifier'] for row in rows] == [row['identifier'] for row in expected]
+    for row, other in zip(rows, expected):
+        assert row['risk'] == other['risk']
+        for name in ('gain', 'loss', 'threshold'):
+            assert row[name] == pytest.approx(other[name], rel=1e-9)
+
+
+@pytest.mark.parametrize('units', ['Meters', 'Millimeters'])
+@pytest.mark.parametrize('properties_last', [False, True])
+@pytest.mark.parametrize('chunk_size', [257, hbjson.CHUNK_SIZE])
+def test_assess_rooms_matches_model(tmp_path, units, properties_last, chunk_size):
+    path = _write(_model(units), tmp_path / 'scheme.hbjson', properties_last)
+    rows = list(hbjson.assess_rooms(path, rooms.sap_inputs(**INPUTS), chunk_size))
+    _assert_rows(rows, _expected(path))
+
+
+def test_assess_rooms_months(tmp_path):
+    path = _write(_model(), tmp_path / 'scheme.hbjson')
+    rows = list(hbjson.assess_rooms(path, rooms.sap_inputs(**INPUTS), months=rooms.ALL_MONTHS))
+    _assert_rows(rows, _expected(path, rooms.ALL_MONTHS))
+    assert [row['month'] for row in rows[:3]] == ['June', 'July', 'August']
+
+
+def test_iter_rooms_constructions(tmp_path):
+    model = _model()
+    path = _write(model, tmp_path / 'scheme.hbjson')
+    for room, other in zip(hbjson.iter_rooms(path), model.rooms):
+        assert room.identifier == other.identifier
+        assert [ap.properties.energy.construction.identifier for ap in room.apertures] == \
+            [ap.properties.energy.construction.identifier for ap in other.apertures]
+
+
+def test_iter_members_skips_keys(tmp_path):
+    path = _write(_model(), tmp_path / 'scheme.hbjson')
+    members = list(hbjson.iter_members(path, load_rooms=False, keys=('units',)))
+    assert [key for key, _ in members if key != 'rooms'] == ['units']
+    assert sum(1 for key, _ in members if key == 'rooms') == 6
+    assert hbjson.model_properties(path)['units'] == 'Meters'
@@ -0,0 +1,91 @@
+"""Round trip of the inverse solver: the solved values put back into sweep.sweep meet the target band."""
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from overheating import inverse, tables
+
+LATITUDE = 51.5
+MONTH = tables.DEFAULT_MONTH
+SOLAR_FLUX = 195.0
+EX_T_AVERAGE = 16.9
+
+PARAMETERS = {'g_value': 0.63, 'WWR': 0.35, 'U_window': 1.6, 'U_wall': 0.28, 'U_roof': 0.16, 'overhangs': 0.0,
+    'curt_blind': 2, 'time_fraction': 0.5, 'opn_type': 1, 'TMP': 180}
+# input solved by every solver
+SOLVED = {inverse.max_g_value: 'g_value', inverse.max_wwr: 'WWR', inverse.min_overhang: 'overhangs',
+    inverse.min_opn_type: 'opn_type'}
+
+
+def _bands(walls, masses, name, values, parameters):
+    # band of every mass in sweep.sweep with its own value of the named input
+    from overheating import sweep
+    other = dict((key, value) for key, value in parameters.items() if key != name)
+    result = sweep.sweep(walls, masses, SOLAR_FLUX, LATITUDE, tables.SOLAR_DECLINATION[MONTH], EX_T_AVERAGE,
+        **dict(other, **{name: values}))
+    axis = 1 + list(result['parameters']).index(name)
+    band = np.moveaxis(result['band'], axis, 1).reshape(len(masses['volume']), len(values), -1)[:, :, 0]
+    return band[np.arange(len(masses['volume'])), np.arange(len(values))]
+
+
+def _solve(walls, masses, solver, target, parameters, ex_t_average=EX_T_AVERAGE):
+    name = SOLVED[solver]
+    other = dict((key, value) for key, value in parameters.items() if key != name)
+    return name, solver(walls, masses, SOLAR_FLUX, LATITUDE, tables.SOLAR_DECLINATION[MONTH], ex_t_average, target,
+        **other)
+
+
+@pytest.mark.parametrize('target', [0, 1, 2])
+@pytest.mark.parametrize('solver', [inverse.max_g_value, inverse.max_wwr])
+def test_max_round_trip(make_massing, solver, target):
+    walls, masses = make_massing(n_masses=300, seed=5)
+    name, values = _solve(walls, masses, solver, target, PARAMETERS)
+    solved = np.isfinite(values)
+    assert solved.all()
+    # the values meet the target, and a value a little above them does not (unless capped at the bound)
+    assert (_bands(walls, masses, name, np.where(solved, values, 0.0), PARAMETERS)[solved] <= target).all()
+    below_bound = solved & (values < inverse.BOUNDS[name])
+    above = _bands(walls, masses, name, np.where(below_bound, values * (1 + 1e-9), 0.0), PARAMETERS)
+    assert below_bound.any()
+    assert (above[below_bound] > target).all()
+
+
+@pytest.mark.parametrize('solver', [inverse.max_g_value, inverse.max_wwr])
+def test_max_without_solution(massing, solver):
+    # the external temperature and the thermal mass alone are above the upper bin of the first band
+    walls, masses = massing
+    name, values = _solve(walls, masses, solver, 0, PARAMETERS, ex_t_average=20.0)
+    assert np.isnan(values).all()
+
+
+@pytest.mark.parametrize('target', [0, 1, 2])
+def test_min_overhang_round_trip(make_massing, target):
+    walls, masses = make_massing(n_masses=300, seed=6)
+    name, values = _solve(walls, masses, inverse.min_overhang, target, PARAMETERS)
+    solved = np.isfinite(values)
+    assert solved.any()
+    assert (_bands(walls, masses, name, np.where(solved, values, 0.0), PARAMETERS)[solved] <= target).all()
+    shaded = solved & (values > 0)
+    assert shaded.any()
+    shallower = _bands(walls, masses, name, np.where(shaded, values * (1 - 1e-9), 0.0), PARAMETERS)
+    assert (shallower[shaded] > target).all()
+
+
+@pytest.mark.parametrize('target', [0, 1, 2])
+def test_min_opn_type_round_trip(make_massing, target):
+    walls, masses = make_massing(n_masses=300, seed=7)
+    name, values = _solve(walls, masses, inverse.min_opn_type, target, PARAMETERS)
+    solved = values >= 0
+    assert solved.any()
+    assert (_bands(walls, masses, name, np.where(solved, values, 0), PARAMETERS)[solved] <= target).all()
+    lower = solved & (values > 0)
+    assert (_bands(walls, masses, name, np.where(lower, values - 1, 0), PARAMETERS)[lower] > target).all()
+    assert (_bands(walls, masses, name, np.full(len(values), 3), PARAMETERS)[~solved] > target).all()
+
+
+def test_top_band_is_unconstrained(massing):
+    walls, masses = massing
+    result = inverse.solve(walls, masses, SOLAR_FLUX, LATITUDE, tables.SOLAR_DECLINATION[MONTH], EX_T_AVERAGE,
+        len(tables.RISK_BINS), **PARAMETERS)
+    for name, values in result.items():
+        assert (values == inverse.BOUNDS[name]).all()
@@ -0,0 +1,62 @@
+"""sweep.sweep against the scalar calculation of overheating.sap, one combination of the inputs at a time."""
+import itertools
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from overheating import sap, sweep, tables
+
+LATITUDE = 52.7
+MONTH = tables.DEFAULT_MONTH
+SOLAR_FLUX = 185.0
+EX_T_AVERAGE = 16.0
+
+GRID = {'g_value': [0.4, 0.7], 'WWR': [0.15, 0.4], 'U_window': [1.2, 2.0], 'U_wall': [0.3], 'U_roof': [0.0, 0.2],
+    'overhangs': [0.0, 0.5], 'curt_blind': [-1, 3], 'time_fraction': [0.0, 0.5], 'opn_type': [0, 2],
+    'TMP': [100, 300], 'FF': [0.7]}
+
+
+def _scalar_threshold(walls, masses, mass, p):
+    # threshold temperature of one mass with the scalar functions of overheating.sap
+    gain = loss = 0.0
+    for i in np.flatnonzero(walls['room'] == mass):
+        key, area = int(walls['orientation'][i]), float(walls['area'][i])
+        s_flux = sap.solar_flux(SOLAR_FLUX, key, float(walls['inclination'][i]), LATITUDE,
+            tables.SOLAR_DECLINATION[MONTH])
+        z = sap.z_summer(key, float(walls['solar_access'][i]), p['curt_blind'], p['time_fraction'], p['overhangs'],
+            float(walls['window_height'][i]), float(walls['window_width'][i]))
+        gain += sap.opening_gain(area * p['WWR'], p['FF'], s_flux, z, p['g_value'])
+        loss += (sap.fabric_loss(area * (1 - p['WWR']), p['U_wall']) + sap.fabric_loss(area * p['WWR'], p['U_window'])
+            + sap.bridging_loss(area))
+    roof_area = float(masses['roof_area'][mass])
+    loss += sap.fabric_loss(roof_area, p['U_roof']) + sap.bridging_loss(roof_area)
+    loss += sap.ventilation_loss(sap.air_change_rate(p['opn_type'], int(masses['bld_type'][mass])),
+        float(masses['volume'][mass]))
+    return sap.threshold_temperature(p['TMP'], sap.summer_ratio(gain, loss), EX_T_AVERAGE)
+
+
+def test_sweep_matches_scalar(massing):
+    walls, masses = massing
+    result = sweep.sweep(walls, masses, SOLAR_FLUX, LATITUDE, tables.SOLAR_DECLINATION[MONTH], EX_T_AVERAGE, **GRID)
+    assert list(result['parameters']) == list(sweep.PARAMETERS)
+    assert result['threshold'].shape == (len(masses['volume']),) + tuple(len(GRID[name]) for name in sweep.PARAMETERS)
+    for index in itertools.product(*[range(len(GRID[name])) for name in sweep.PARAMETERS]):
+        p = dict((name, GRID[name][i]) for name, i in zip(sweep.PARAMETERS, index))
+        for mass in range(len(masses['volume'])):
+            threshold = _scalar_threshold(walls, masses, mass, p)
+            assert result['threshold'][(mass,) + index] == pytest.approx(threshold, rel=1e-6)
+            # the float32 thresholds are only compared away from the bins of the bands
+            if min(abs(threshold - edge) for edge in tables.RISK_BINS) > 1e-6:
+                assert result['band'][(mass,) + index] == sap.risk_band(threshold)
+
+
+def test_sweep_defaults_and_errors(massing):
+    walls, masses = massing
+    args = (walls, masses, SOLAR_FLUX, LATITUDE, tables.SOLAR_DECLINATION[MONTH], EX_T_AVERAGE)
+    result = sweep.sweep(*args, g_value=0.6, WWR=0.3, U_window=1.4, U_wall=0.3, opn_type=1)
+    assert result['band'].shape == (len(masses['volume']),) + (1,) * len(sweep.PARAMETERS)
+    with pytest.raises(ValueError):
+        sweep.sweep(*args, g_value=0.6, WWR=0.3, U_window=1.4, U_wall=0.3)
+    with pytest.raises(ValueError):
+        sweep.sweep(*args, g_value=0.6, WWR=0.3, U_window=1.4, U_wall=0.3, opn_type=1, colour=2)